@@ -0,0 +1,55 @@
+"""Index users by lowercased email
+
+Revision ID: 4e7a2c9d1b05
+Revises: 9c41e7d2b6a8
+Create Date: 2026-10-17 15:03:21.774190
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4e7a2c9d1b05"
+down_revision: Union[str, None] = "9c41e7d2b6a8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_email_lower",
+            "user",
+            [sa.text('lower(email) COLLATE "C"'), sa.text('email COLLATE "C"')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_user_email_pattern",
+            table_name="user",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_email_pattern",
+            "user",
+            [sa.text("lower(email) varchar_pattern_ops")],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_user_email_lower",
+            table_name="user",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
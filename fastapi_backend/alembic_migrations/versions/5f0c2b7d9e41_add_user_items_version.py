@@ -0,0 +1,31 @@
+"""Add user items_version
+
+Revision ID: 5f0c2b7d9e41
+Revises: 735831224170
+Create Date: 2026-10-17 14:05:12.318520
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5f0c2b7d9e41"
+down_revision: Union[str, None] = "735831224170"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant server default doesn't rewrite the table on PostgreSQL 11+
+    op.add_column(
+        "user",
+        sa.Column("items_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("user", "items_version")
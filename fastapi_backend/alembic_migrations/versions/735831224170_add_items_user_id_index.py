@@ -0,0 +1,42 @@
+"""Add items user_id index
+
+Revision ID: 735831224170
+Revises: b389592974f8
+Create Date: 2026-10-17 09:12:31.482047
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "735831224170"
+down_revision: Union[str, None] = "b389592974f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY doesn't lock out writes to the table, but it
+    # can't run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_items_user_id_id",
+            "items",
+            ["user_id", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_items_user_id_id",
+            table_name="items",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
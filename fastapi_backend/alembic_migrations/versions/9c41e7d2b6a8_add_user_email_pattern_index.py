@@ -0,0 +1,41 @@
+"""Add user email pattern index
+
+Revision ID: 9c41e7d2b6a8
+Revises: f8d3b6e1a2c4
+Create Date: 2026-10-17 09:12:44.501273
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c41e7d2b6a8"
+down_revision: Union[str, None] = "f8d3b6e1a2c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_email_pattern",
+            "user",
+            [sa.text("lower(email) varchar_pattern_ops")],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_user_email_pattern",
+            table_name="user",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
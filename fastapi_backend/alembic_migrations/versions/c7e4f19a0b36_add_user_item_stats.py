@@ -0,0 +1,46 @@
+"""Add user item stats
+
+Revision ID: c7e4f19a0b36
+Revises: a3d81e6f2c57
+Create Date: 2026-10-17 16:48:03.274905
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e4f19a0b36"
+down_revision: Union[str, None] = "a3d81e6f2c57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_item_stats",
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("item_count", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column(
+            "total_quantity", sa.BigInteger(), server_default="0", nullable=False
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    # Items written while this runs, by code that doesn't maintain the stats
+    # yet, are only picked up by commands.reconcile_item_stats.
+    op.execute(
+        """
+        INSERT INTO user_item_stats (user_id, item_count, total_quantity)
+        SELECT user_id, count(*), coalesce(sum(quantity), 0)
+        FROM items
+        GROUP BY user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_item_stats")
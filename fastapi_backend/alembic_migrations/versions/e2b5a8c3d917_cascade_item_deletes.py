@@ -0,0 +1,44 @@
+"""Cascade item deletes from their user
+
+Revision ID: e2b5a8c3d917
+Revises: c7e4f19a0b36
+Create Date: 2026-10-17 18:12:40.581377
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b5a8c3d917"
+down_revision: Union[str, None] = "c7e4f19a0b36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def replace_user_id_foreign_key(ondelete: Union[str, None]) -> None:
+    op.drop_constraint("items_user_id_fkey", "items", type_="foreignkey")
+    # Existing rows are checked after the constraint is committed, which only
+    # blocks writes to items while the constraint is swapped, not while
+    # the whole table is scanned
+    op.create_foreign_key(
+        "items_user_id_fkey",
+        "items",
+        "user",
+        ["user_id"],
+        ["id"],
+        ondelete=ondelete,
+        postgresql_not_valid=True,
+    )
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE items VALIDATE CONSTRAINT items_user_id_fkey")
+
+
+def upgrade() -> None:
+    replace_user_id_foreign_key("CASCADE")
+
+
+def downgrade() -> None:
+    replace_user_id_foreign_key(None)
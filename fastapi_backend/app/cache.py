@@ -0,0 +1,281 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+from urllib.parse import urlparse
+from uuid import UUID
+
+from .config import settings
+
+
+class CacheError(Exception):
+    pass
+
+
+# What a cache server going away, misbehaving or not answering raises
+CACHE_ERRORS = (OSError, TimeoutError, asyncio.IncompleteReadError, CacheError)
+
+
+class CacheBackend(ABC):
+    name: str
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+
+class InMemoryCache(CacheBackend):
+    """LRU cache with per-entry expiry, local to the worker process."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache(CacheBackend):
+    """Cache on a server speaking the Redis protocol (RESP).
+
+    Commands run on a pool of up to ``max_connections`` connections, each
+    sending one command at a time. Connections are opened as commands need
+    them, kept once idle, and dropped after any error. A command that takes
+    longer than ``timeout`` seconds, waiting for a connection included, fails
+    with ``TimeoutError``.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self, url: str, timeout: float = 1.0, max_connections: int = 10
+    ) -> None:
+        parsed_url = urlparse(url)
+        self.host = parsed_url.hostname or "localhost"
+        self.port = parsed_url.port or 6379
+        self.password = parsed_url.password
+        self.db = int(parsed_url.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.execute("SET", key, value, "PX", max(int(ttl * 1000), 1))
+
+    async def execute(self, *args: Any) -> Any:
+        return await asyncio.wait_for(self._execute(*args), self.timeout)
+
+    async def _execute(self, *args: Any) -> Any:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await self._connect()
+                reply = await self._send(connection, *args)
+            except BaseException:
+                # After an error or a timeout, a reply may be left unread: the
+                # connection is dropped without waiting on the server.
+                if connection is not None:
+                    connection[1].transport.abort()
+                raise
+            self._idle.append(connection)
+            return reply
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        connection = await asyncio.open_connection(self.host, self.port)
+        try:
+            if self.password:
+                await self._send(connection, "AUTH", self.password)
+            if self.db:
+                await self._send(connection, "SELECT", self.db)
+        except BaseException:
+            connection[1].transport.abort()
+            raise
+        return connection
+
+    async def _send(
+        self, connection: tuple[asyncio.StreamReader, asyncio.StreamWriter], *args: Any
+    ) -> Any:
+        reader, writer = connection
+        writer.write(encode_command(args))
+        await writer.drain()
+        return await read_reply(reader)
+
+
+def encode_command(args: tuple[Any, ...]) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        value = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readuntil(b"\r\n")
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+        return payload.decode()
+    if prefix == b"-":
+        raise CacheError(payload.decode())
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise CacheError(f"Unexpected reply {line!r}")
+
+
+class ItemPageCache:
+    """Encoded item pages, keyed by the ``items_version`` of their user.
+
+    Every write of a user's items bumps their version in the database, so pages
+    cached before it are no longer looked up, and expire. The version is read
+    before the page, so a page read from a lagging replica is stored under the
+    version it was read with, never a newer one.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def page_key(user_id: UUID, version: int, *parts: Any) -> str:
+        """Return the key of a page of ``user_id`` at ``version`` of their items."""
+        return ":".join(["items:page", str(user_id), str(version), *map(str, parts)])
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = await self.backend.get(key)
+        except CACHE_ERRORS:
+            self.errors += 1
+            return None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except CACHE_ERRORS:
+            self.errors += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+class UserCache:
+    """Column values of users by id, so authenticating a request needs no query.
+
+    The cache is local to the worker process: changes made through other
+    workers only reach it through their notifications, or once entries expire.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[UUID, tuple[dict[str, Any], float]] = OrderedDict()
+
+    def get(self, user_id: UUID) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, user_id: UUID, values: dict[str, Any]) -> None:
+        self._entries[user_id] = (values, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: UUID) -> None:
+        self._entries.pop(user_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def create_item_page_cache() -> Optional[ItemPageCache]:
+    if settings.ITEMS_CACHE_BACKEND == "memory":
+        backend: CacheBackend = InMemoryCache(settings.ITEMS_CACHE_MAX_ENTRIES)
+    elif settings.ITEMS_CACHE_BACKEND == "redis":
+        backend = RedisCache(
+            settings.ITEMS_CACHE_URL,
+            settings.REDIS_TIMEOUT_SECONDS,
+            settings.REDIS_MAX_CONNECTIONS,
+        )
+    else:
+        return None
+    return ItemPageCache(backend, settings.ITEMS_CACHE_SECONDS)
+
+
+item_page_cache = create_item_page_cache()
+
+user_cache = (
+    UserCache(settings.USERS_CACHE_MAX_ENTRIES, settings.USERS_CACHE_SECONDS)
+    if settings.USERS_CACHE_SECONDS > 0
+    else None
+)
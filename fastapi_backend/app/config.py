@@ -1,4 +1,4 @@
-from typing import Set
+from typing import Literal, Set
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -12,12 +12,101 @@ class Settings(BaseSettings):
     TEST_DATABASE_URL: str | None = None
     EXPIRE_ON_COMMIT: bool = False
 
+    # Connection pooling: "null" opens a connection per checkout (serverless),
+    # "queue" keeps a sized pool for long-running workers and "pgbouncer" is a
+    # sized pool that is safe behind PgBouncer in transaction mode.
+    DATABASE_POOL_MODE: Literal["null", "queue", "pgbouncer"] = "null"
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+
+    # Read replicas: read-only dependencies are routed to these, and a user's
+    # reads stay on the primary for READ_YOUR_WRITES_SECONDS after they write.
+    # Writes are remembered by the worker taking them, "memory", or by every
+    # worker with "redis" via READ_YOUR_WRITES_URL, which multiple workers need.
+    DATABASE_REPLICA_URLS: list[str] = []
+    READ_YOUR_WRITES_SECONDS: float = 5
+    READ_YOUR_WRITES_BACKEND: Literal["memory", "redis"] = "memory"
+    READ_YOUR_WRITES_URL: str = "redis://localhost:6379/0"
+
+    # Items
+    ITEMS_COUNT_STRATEGY: Literal["exact", "cached", "estimate"] = "exact"
+    ITEMS_COUNT_CACHE_SECONDS: float = 60
+    # Estimates below this are replaced by a cached count, as they are the least
+    # accurate there, and never below 1 even for a user without items
+    ITEMS_COUNT_ESTIMATE_THRESHOLD: int = 1000
+    # Encode item pages straight from the rows, skipping the response model
+    ITEMS_FAST_SERIALIZATION: bool = False
+    ITEMS_BULK_MAX_SIZE: int = 1000
+    # Bulk creations of at least this many items are loaded with COPY
+    ITEMS_BULK_COPY_THRESHOLD: int = 500
+    ITEMS_EXPORT_BATCH_SIZE: int = 1000
+    ITEMS_IMPORT_BATCH_SIZE: int = 5000
+    # Longest NDJSON line or CSV record imports accept, in characters
+    ITEMS_IMPORT_MAX_RECORD_LENGTH: int = 100_000
+    # Invalid rows past this are still counted, but not reported individually
+    ITEMS_IMPORT_MAX_ERRORS: int = 1000
+    # Caching of GET /items/ pages: "memory" is local to each worker process,
+    # so only use it with a single worker, "redis" is shared via ITEMS_CACHE_URL.
+    ITEMS_CACHE_BACKEND: Literal["none", "memory", "redis"] = "none"
+    ITEMS_CACHE_URL: str = "redis://localhost:6379/0"
+    ITEMS_CACHE_SECONDS: float = 30
+    ITEMS_CACHE_MAX_ENTRIES: int = 10_000
+    # Longest wait for a Redis command, connecting and queueing included, of the
+    # items cache and the auth rate limits, which carry on without Redis past it
+    REDIS_TIMEOUT_SECONDS: float = 1
+    # Connections each of them opens to Redis at most, per worker process
+    REDIS_MAX_CONNECTIONS: int = 10
+
     # User
     ACCESS_SECRET_KEY: str
     RESET_PASSWORD_SECRET_KEY: str
     VERIFICATION_SECRET_KEY: str
-    ALGORITHM: str = "HS256"
+    # HS256 signs access tokens with ACCESS_SECRET_KEY. RS256 and ES256 sign
+    # them with the PEM ACCESS_PRIVATE_KEY, whose public key is published under
+    # ACCESS_KEY_ID at /.well-known/jwks.json. ACCESS_PUBLIC_KEYS (key id to
+    # PEM) are published and accepted too, to rotate keys without downtime.
+    ALGORITHM: Literal["HS256", "RS256", "ES256"] = "HS256"
+    ACCESS_PRIVATE_KEY: str | None = None
+    ACCESS_KEY_ID: str | None = None
+    ACCESS_PUBLIC_KEYS: dict[str, str] = {}
     ACCESS_TOKEN_EXPIRE_SECONDS: int = 3600
+    # Read endpoints trust the user claims of access tokens this recent, and
+    # look up the user for older ones
+    ACCESS_TOKEN_CLAIMS_SECONDS: int = 300
+    # Revoked access tokens are mirrored in each worker by a Bloom filter sized
+    # for this many unexpired revocations, and refreshed from the database
+    # every TOKEN_REVOCATION_REFRESH_SECONDS.
+    TOKEN_REVOCATION_CAPACITY: int = 100_000
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 5
+    # Verified access tokens kept decoded until they expire, 0 to verify every use
+    ACCESS_TOKEN_CACHE_SIZE: int = 10_000
+    # Token buckets limiting login and registration attempts per client IP and
+    # per e-mail. "memory" is local to each worker process, "redis" is shared
+    # via AUTH_RATE_LIMIT_URL. Behind a proxy or load balancer, run uvicorn with
+    # --proxy-headers and --forwarded-allow-ips set to the proxy's address, or
+    # every client is counted as the proxy's IP.
+    AUTH_RATE_LIMIT_BACKEND: Literal["none", "memory", "redis"] = "memory"
+    AUTH_RATE_LIMIT_URL: str = "redis://localhost:6379/0"
+    AUTH_RATE_LIMIT_IP_BURST: int = 30
+    AUTH_RATE_LIMIT_IP_PER_MINUTE: float = 60
+    AUTH_RATE_LIMIT_EMAIL_BURST: int = 10
+    AUTH_RATE_LIMIT_EMAIL_PER_MINUTE: float = 10
+    AUTH_RATE_LIMIT_MAX_KEYS: int = 100_000
+    # Threads that hash and verify passwords off the event loop, 0 hashes on it
+    PASSWORD_HASH_WORKERS: int = 4
+    # Users with at least this many items are deactivated on deletion and
+    # purged in the background, USERS_PURGE_BATCH_SIZE items per transaction.
+    USERS_BACKGROUND_PURGE_THRESHOLD: int | None = None
+    USERS_PURGE_BATCH_SIZE: int = 5000
+    # Caching of authenticated user lookups, per worker process, disabled at 0.
+    # With USERS_CACHE_NOTIFY, workers tell each other about user changes with
+    # Postgres NOTIFY, which needs a direct connection rather than PgBouncer.
+    USERS_CACHE_SECONDS: float = 0
+    USERS_CACHE_MAX_ENTRIES: int = 10_000
+    USERS_CACHE_NOTIFY: bool = False
 
     # Email
     MAIL_USERNAME: str | None = None
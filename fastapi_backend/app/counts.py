@@ -0,0 +1,131 @@
+import json
+import time
+from uuid import UUID
+
+from typing import Any
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .models import Item, UserItemStats
+from .schemas import CountStrategy
+
+# Cached item counts per user, with the items version they were counted at and
+# the monotonic time they expire at. The cache is per worker, but writes bump
+# the version in the database, so a total counted before a write through any
+# worker is never reused after it.
+_item_counts: dict[UUID, tuple[int, int, float]] = {}
+_ITEM_COUNTS_SWEEP_SIZE = 10_000
+
+
+async def exact_item_count(db: AsyncSession, user_id: UUID) -> int:
+    return await db.scalar(
+        select(func.count()).select_from(Item).where(Item.user_id == user_id)
+    )
+
+
+async def estimate_item_count(db: AsyncSession, user_id: UUID) -> int:
+    """Estimate the number of items of ``user_id`` without scanning them.
+
+    This is the planner's row estimate, derived from the table size in
+    ``pg_class`` and the ``user_id`` column statistics, so it is only as fresh
+    as the last ANALYZE of the table.
+    """
+    plan = await db.scalar(
+        text("EXPLAIN (FORMAT JSON) SELECT 1 FROM items WHERE user_id = :user_id"),
+        {"user_id": user_id},
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_items(
+    db: AsyncSession, user_id: UUID, strategy: CountStrategy, version: int
+) -> int:
+    """Count the items of ``user_id``, at ``version`` of their items.
+
+    Cached totals are only reused while the user's ``items_version`` is still
+    ``version``, which the caller reads before counting. Estimates below
+    ``ITEMS_COUNT_ESTIMATE_THRESHOLD`` are replaced by a cached total.
+    """
+    if strategy == CountStrategy.estimate:
+        estimate = await estimate_item_count(db, user_id)
+        if estimate >= settings.ITEMS_COUNT_ESTIMATE_THRESHOLD:
+            return estimate
+        # Few items are cheap to count
+        strategy = CountStrategy.cached
+
+    if strategy == CountStrategy.exact:
+        return await exact_item_count(db, user_id)
+
+    now = time.monotonic()
+    cached = _item_counts.get(user_id)
+    if cached is not None and cached[0] == version and cached[2] > now:
+        return cached[1]
+
+    total = await exact_item_count(db, user_id)
+    if len(_item_counts) >= _ITEM_COUNTS_SWEEP_SIZE:
+        for expired_user_id in [
+            key for key, (_, _, expires_at) in _item_counts.items() if expires_at <= now
+        ]:
+            del _item_counts[expired_user_id]
+    _item_counts[user_id] = (version, total, now + settings.ITEMS_COUNT_CACHE_SECONDS)
+    return total
+
+
+def update_item_stats(user_id: UUID, item_count: Any, total_quantity: Any) -> Insert:
+    """Add ``item_count`` and ``total_quantity`` to the item stats of ``user_id``.
+
+    This runs in the transaction changing the items, often as a CTE of the
+    statement doing so. The amounts may be SQL expressions.
+    """
+    statement = insert(UserItemStats).values(
+        user_id=user_id, item_count=item_count, total_quantity=total_quantity
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[UserItemStats.user_id],
+        set_={
+            "item_count": UserItemStats.item_count + statement.excluded.item_count,
+            "total_quantity": (
+                UserItemStats.total_quantity + statement.excluded.total_quantity
+            ),
+        },
+    )
+
+
+async def reconcile_item_stats(db: AsyncSession, user_id: UUID) -> bool:
+    """Recompute the item stats of ``user_id`` from their items.
+
+    The stats row is locked before counting, so a concurrent write is either
+    committed and counted, or adds its change on top once this commits.
+    Returns whether the stats had drifted. The caller commits.
+    """
+    await db.execute(
+        insert(UserItemStats).values(user_id=user_id).on_conflict_do_nothing()
+    )
+    stats = (
+        await db.execute(
+            select(UserItemStats.item_count, UserItemStats.total_quantity)
+            .where(UserItemStats.user_id == user_id)
+            .with_for_update()
+        )
+    ).one()
+    actual = (
+        await db.execute(
+            select(func.count(), func.coalesce(func.sum(Item.quantity), 0)).where(
+                Item.user_id == user_id
+            )
+        )
+    ).one()
+    if tuple(stats) == tuple(actual):
+        return False
+
+    await db.execute(
+        update(UserItemStats)
+        .where(UserItemStats.user_id == user_id)
+        .values(item_count=actual[0], total_quantity=actual[1])
+    )
+    return True
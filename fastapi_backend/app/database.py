@@ -1,40 +1,339 @@
-from typing import AsyncGenerator
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Optional,
+    Sequence,
+)
 from urllib.parse import urlparse
+from uuid import UUID, uuid4
 
 from fastapi import Depends
 from fastapi_users.db import SQLAlchemyUserDatabase
-from sqlalchemy import NullPool
+from sqlalchemy import AsyncAdaptedQueuePool, NullPool, Table, func, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.pool import ConnectionPoolEntry, Pool
 
+from . import cache
 from .config import settings
 from .models import Base, User
 
 
-parsed_db_url = urlparse(settings.DATABASE_URL)
+def get_async_db_connection_url(database_url: str) -> str:
+    parsed_db_url = urlparse(database_url)
+    return (
+        f"postgresql+asyncpg://{parsed_db_url.username}:{parsed_db_url.password}@"
+        f"{parsed_db_url.hostname}{':' + str(parsed_db_url.port) if parsed_db_url.port else ''}"
+        f"{parsed_db_url.path}"
+    )
 
-async_db_connection_url = (
-    f"postgresql+asyncpg://{parsed_db_url.username}:{parsed_db_url.password}@"
-    f"{parsed_db_url.hostname}{':' + str(parsed_db_url.port) if parsed_db_url.port else ''}"
-    f"{parsed_db_url.path}"
-)
 
-# Disable connection pooling for serverless environments like Vercel
-engine = create_async_engine(async_db_connection_url, poolclass=NullPool)
+async_db_connection_url = get_async_db_connection_url(settings.DATABASE_URL)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection.
+
+    The wait includes opening a new connection when the pool is not full yet,
+    which is what a request actually pays before it can run its first query.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        record = super()._do_get()
+        waited = time.perf_counter() - start
+        self.checkouts += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return record
+
+
+def get_engine_options(pool_mode: str) -> dict[str, Any]:
+    """Return the ``create_async_engine`` pooling options for ``pool_mode``."""
+    if pool_mode == "null":
+        # Disable connection pooling for serverless environments like Vercel
+        return {"poolclass": NullPool}
+
+    options: dict[str, Any] = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+    }
+    if pool_mode == "pgbouncer":
+        # In transaction mode PgBouncer may run each transaction on a different
+        # server connection, so prepared statements can't be cached or reused.
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return options
+
+
+engine = create_async_engine(
+    async_db_connection_url, **get_engine_options(settings.DATABASE_POOL_MODE)
+)
 
 async_session_maker = async_sessionmaker(
     engine, expire_on_commit=settings.EXPIRE_ON_COMMIT
 )
 
+replica_engines = [
+    create_async_engine(
+        get_async_db_connection_url(replica_url),
+        **get_engine_options(settings.DATABASE_POOL_MODE),
+    )
+    for replica_url in settings.DATABASE_REPLICA_URLS
+]
+
+replica_session_makers = [
+    async_sessionmaker(replica_engine, expire_on_commit=settings.EXPIRE_ON_COMMIT)
+    for replica_engine in replica_engines
+]
+
+_replica_session_makers_cycle = itertools.cycle(replica_session_makers)
+
+# Users that wrote recently, mapped to the monotonic time their reads may go
+# back to the replicas. This is tracked per worker process, and shared with the
+# other workers through recent_writes_redis when there is one.
+_recent_writes: dict[UUID, float] = {}
+_RECENT_WRITES_SWEEP_SIZE = 10_000
+
+recent_writes_redis = (
+    cache.RedisCache(
+        settings.READ_YOUR_WRITES_URL,
+        settings.REDIS_TIMEOUT_SECONDS,
+        settings.REDIS_MAX_CONNECTIONS,
+    )
+    if settings.READ_YOUR_WRITES_BACKEND == "redis"
+    else None
+)
+# When recent_writes_redis last failed, reads skip it until this monotonic time
+_recent_writes_redis_retry_at = 0.0
+
+
+async def mark_recent_write(user_id: UUID) -> None:
+    """Pin the reads of ``user_id`` to the primary for a short window."""
+    now = time.monotonic()
+    if len(_recent_writes) >= _RECENT_WRITES_SWEEP_SIZE:
+        for expired_user_id in [
+            key for key, expires_at in _recent_writes.items() if expires_at <= now
+        ]:
+            del _recent_writes[expired_user_id]
+    _recent_writes[user_id] = now + settings.READ_YOUR_WRITES_SECONDS
+
+    if recent_writes_redis is not None:
+        try:
+            await recent_writes_redis.set(
+                f"recent_write:{user_id}", b"1", settings.READ_YOUR_WRITES_SECONDS
+            )
+        except cache.CACHE_ERRORS:
+            # Only this worker pins the user's reads then
+            pass
+
+
+async def has_recent_write(user_id: UUID) -> bool:
+    expires_at = _recent_writes.get(user_id)
+    if expires_at is not None:
+        if expires_at > time.monotonic():
+            return True
+        _recent_writes.pop(user_id, None)
+
+    # Only writes made by the other workers are left to look up
+    global _recent_writes_redis_retry_at
+    if recent_writes_redis is None or time.monotonic() < _recent_writes_redis_retry_at:
+        return False
+    try:
+        return await recent_writes_redis.get(f"recent_write:{user_id}") is not None
+    except cache.CACHE_ERRORS:
+        # Read from the replicas, as without Redis, rather than sending every
+        # read to the primary or waiting on Redis again for a while
+        _recent_writes_redis_retry_at = (
+            time.monotonic() + settings.READ_YOUR_WRITES_SECONDS
+        )
+        return False
+
+
+def _get_pool_stats(pool: Pool) -> dict[str, Any]:
+    stats: dict[str, Any] = {}
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            checkouts=pool.checkouts,
+            avg_wait_ms=(
+                pool.total_wait / pool.checkouts * 1000 if pool.checkouts else 0.0
+            ),
+            max_wait_ms=pool.max_wait * 1000,
+        )
+    return stats
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """Return live statistics of the primary and replica connection pools."""
+    return {
+        "mode": settings.DATABASE_POOL_MODE,
+        **_get_pool_stats(engine.pool),
+        "replicas": [
+            _get_pool_stats(replica_engine.pool) for replica_engine in replica_engines
+        ],
+    }
+
 
 async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
 
+async def copy_records(
+    session: AsyncSession,
+    table: Table,
+    columns: Sequence[str],
+    records: Iterable[Sequence[Any]] | AsyncIterable[Sequence[Any]],
+) -> None:
+    """Load ``records`` into ``table`` with COPY.
+
+    COPY runs on the session's connection, so it's part of the session's
+    transaction and is only visible once the session commits.
+    """
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        table.name, records=records, columns=list(columns), schema_name=table.schema
+    )
+
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
 
 
+async def get_read_async_session(
+    session: AsyncSession = Depends(get_async_session),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Yield a session for read-only work.
+
+    Sessions are handed out round-robin across the read replicas. Without
+    replicas this is the request's primary session.
+    """
+    if not replica_session_makers:
+        yield session
+        return
+
+    async with next(_replica_session_makers_cycle)() as replica_session:
+        yield replica_session
+
+
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
     yield SQLAlchemyUserDatabase(session, User)
+
+
+class CachedUserDatabase(SQLAlchemyUserDatabase):
+    """User database whose lookups by id go through the user cache.
+
+    Users served from the cache are detached from the session, so only their
+    columns can be read. Users that changed recently are looked up on
+    ``primary_session``, as the replica ``session`` may not show the change yet.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        user_table: type[User],
+        primary_session: Optional[AsyncSession] = None,
+    ) -> None:
+        super().__init__(session, user_table)
+        self.primary_session = primary_session or session
+
+    async def get(self, id: UUID) -> Optional[User]:
+        user_cache = cache.user_cache
+        values = user_cache.get(id) if user_cache is not None else None
+        if values is not None:
+            user = User(**values)
+            make_transient_to_detached(user)
+            return user
+
+        if self.primary_session is not self.session and await has_recent_write(id):
+            user = await SQLAlchemyUserDatabase(
+                self.primary_session, self.user_table
+            ).get(id)
+        else:
+            user = await super().get(id)
+        if user is not None and user_cache is not None:
+            user_cache.set(
+                id,
+                {
+                    attr.key: getattr(user, attr.key)
+                    for attr in inspect(User).column_attrs
+                },
+            )
+        return user
+
+
+async def get_read_user_db(
+    session: AsyncSession = Depends(get_read_async_session),
+    primary_session: AsyncSession = Depends(get_async_session),
+):
+    yield CachedUserDatabase(session, User, primary_session)
+
+
+USER_CACHE_CHANNEL = "user_cache"
+
+
+async def user_changed(session: AsyncSession, user_id: UUID) -> None:
+    """Drop ``user_id`` from the user cache, in every worker with NOTIFY, and
+    pin their lookups to the primary for a while.
+
+    Call this once the change is committed. The notification is sent in a
+    transaction of its own on ``session``.
+    """
+    await mark_recent_write(user_id)
+    user_cache = cache.user_cache
+    if user_cache is None:
+        return
+    user_cache.invalidate(user_id)
+    if settings.USERS_CACHE_NOTIFY:
+        await session.execute(select(func.pg_notify(USER_CACHE_CHANNEL, str(user_id))))
+        await session.commit()
+
+
+@asynccontextmanager
+async def listen_for_user_changes() -> AsyncIterator[None]:
+    """Keep the user cache in sync with other workers while the context is open.
+
+    Notifications are received on a dedicated connection. If it's lost, other
+    workers' changes only show once the cached users expire.
+    """
+    user_cache = cache.user_cache
+    if user_cache is None or not settings.USERS_CACHE_NOTIFY:
+        yield
+        return
+
+    def on_notification(connection, pid, channel, payload):
+        user_cache.invalidate(UUID(payload))
+
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        listener = raw_connection.driver_connection
+        await listener.add_listener(USER_CACHE_CHANNEL, on_notification)
+        try:
+            yield
+        finally:
+            await listener.remove_listener(USER_CACHE_CHANNEL, on_notification)
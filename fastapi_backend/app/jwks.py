@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from cryptography.hazmat.primitives.serialization import (
+    load_pem_private_key,
+    load_pem_public_key,
+)
+from jwt.algorithms import ECAlgorithm, RSAAlgorithm
+
+from .config import settings
+
+PrivateKey = Union[rsa.RSAPrivateKey, ec.EllipticCurvePrivateKey]
+PublicKey = Union[rsa.RSAPublicKey, ec.EllipticCurvePublicKey]
+
+
+def check_key(algorithm: str, key: Union[PrivateKey, PublicKey]) -> None:
+    if algorithm == "RS256" and isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return
+    if (
+        algorithm == "ES256"
+        and isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey))
+        and isinstance(key.curve, ec.SECP256R1)
+    ):
+        return
+    raise ValueError(f"Key is not a {algorithm} key")
+
+
+@dataclass(frozen=True)
+class SigningKeys:
+    """The key access tokens are signed with, and the keys they're verified
+    with, by key id.
+
+    The public keys include other keys than the signing key's during a
+    rotation: the next key, published ahead of signing with it, and the
+    previous keys, accepted until the tokens they signed expire.
+    """
+
+    algorithm: str
+    key_id: str
+    private_key: PrivateKey
+    public_keys: dict[str, PublicKey]
+
+    @classmethod
+    def from_pem(
+        cls,
+        algorithm: str,
+        key_id: str,
+        private_key: str,
+        public_keys: dict[str, str],
+    ) -> "SigningKeys":
+        signing_key = load_pem_private_key(private_key.encode(), password=None)
+        check_key(algorithm, signing_key)
+        loaded_public_keys = {
+            other_key_id: load_pem_public_key(pem.encode())
+            for other_key_id, pem in public_keys.items()
+        }
+        for public_key in loaded_public_keys.values():
+            check_key(algorithm, public_key)
+        loaded_public_keys[key_id] = signing_key.public_key()
+        return cls(algorithm, key_id, signing_key, loaded_public_keys)
+
+    def jwks(self) -> dict[str, Any]:
+        """Return the public keys as a JSON Web Key Set."""
+        to_jwk = (
+            RSAAlgorithm.to_jwk if self.algorithm == "RS256" else ECAlgorithm.to_jwk
+        )
+        return {
+            "keys": [
+                {
+                    **to_jwk(public_key, as_dict=True),
+                    "kid": key_id,
+                    "alg": self.algorithm,
+                    "use": "sig",
+                }
+                for key_id, public_key in self.public_keys.items()
+            ]
+        }
+
+
+def load_signing_keys() -> Optional[SigningKeys]:
+    if settings.ALGORITHM == "HS256":
+        return None
+    if settings.ACCESS_PRIVATE_KEY is None or settings.ACCESS_KEY_ID is None:
+        raise ValueError(
+            f"ACCESS_PRIVATE_KEY and ACCESS_KEY_ID are required with {settings.ALGORITHM}"
+        )
+    return SigningKeys.from_pem(
+        settings.ALGORITHM,
+        settings.ACCESS_KEY_ID,
+        settings.ACCESS_PRIVATE_KEY,
+        settings.ACCESS_PUBLIC_KEYS,
+    )
@@ -1,13 +1,30 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
 from fastapi_pagination import add_pagination
 from .schemas import UserCreate, UserRead, UserUpdate
 from .users import auth_backend, fastapi_users, AUTH_URL_PATH
 from fastapi.middleware.cors import CORSMiddleware
 from .utils import simple_generate_unique_route_id
+from app.routes.auth import router as auth_router
 from app.routes.items import router as items_router
+from app.routes.metrics import router as metrics_router
+from app.routes.users import router as users_router
+from app.routes.well_known import router as well_known_router
 from app.config import settings
+from app.database import listen_for_user_changes
+from app.rate_limit import limit_auth_attempts
+from app.revocation import keep_revocations_fresh
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with listen_for_user_changes(), keep_revocations_fresh():
+        yield
+
 
 app = FastAPI(
+    lifespan=lifespan,
     generate_unique_id_function=simple_generate_unique_route_id,
     openapi_url=settings.OPENAPI_URL,
 )
@@ -22,15 +39,23 @@ app.add_middleware(
 )
 
 # Include authentication and user management routes
+# Login and registration attempts are rate limited before anything else runs,
+# logouts are not
+jwt_auth_router = fastapi_users.get_auth_router(auth_backend)
+for route in jwt_auth_router.routes:
+    if route.name == f"auth:{auth_backend.name}.login":
+        route.dependencies.append(Depends(limit_auth_attempts))
 app.include_router(
-    fastapi_users.get_auth_router(auth_backend),
+    jwt_auth_router,
     prefix=f"/{AUTH_URL_PATH}/jwt",
     tags=["auth"],
 )
+app.include_router(auth_router, prefix=f"/{AUTH_URL_PATH}/jwt")
 app.include_router(
     fastapi_users.get_register_router(UserRead, UserCreate),
     prefix=f"/{AUTH_URL_PATH}",
     tags=["auth"],
+    dependencies=[Depends(limit_auth_attempts)],
 )
 app.include_router(
     fastapi_users.get_reset_password_router(),
@@ -42,6 +67,7 @@ app.include_router(
     prefix=f"/{AUTH_URL_PATH}",
     tags=["auth"],
 )
+app.include_router(users_router, prefix="/users")
 app.include_router(
     fastapi_users.get_users_router(UserRead, UserUpdate),
     prefix="/users",
@@ -50,4 +76,10 @@ app.include_router(
 
 # Include items routes
 app.include_router(items_router, prefix="/items")
+
+# Include metrics routes
+app.include_router(metrics_router, prefix="/metrics")
+
+# Include the keys other services verify access tokens with
+app.include_router(well_known_router, prefix="/.well-known")
 add_pagination(app)
@@ -1,17 +1,60 @@
 from fastapi_users.db import SQLAlchemyBaseUserTableUUID
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, String, Integer, ForeignKey
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Computed,
+    DateTime,
+    String,
+    Integer,
+    ForeignKey,
+    Index,
+    func,
+)
+from sqlalchemy.orm import deferred, relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from uuid import uuid4
 
+# Text search configuration of Item.search_vector, which queries must use too
+ITEM_SEARCH_CONFIG = "english"
+
+
+def has_pg_trgm(ddl, target, bind, **kw) -> bool:
+    return (
+        bind.exec_driver_sql(
+            "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+        ).first()
+        is not None
+    )
+
 
 class Base(DeclarativeBase):
     pass
 
 
 class User(SQLAlchemyBaseUserTableUUID, Base):
-    items = relationship("Item", back_populates="user", cascade="all, delete-orphan")
+    # Changes whenever the user's items do, the ETag of their item listings
+    items_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Items are deleted by the database's ON DELETE CASCADE, rather than loaded
+    # and deleted one by one when their user is
+    items = relationship(
+        "Item",
+        back_populates="user",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+# The keyset users are listed in: by e-mail case-insensitively, like
+# fastapi-users looks e-mails up, and by the e-mail itself between e-mails only
+# differing in case. In the C collation, the index on it also serves e-mail
+# prefix matches, as LIKE only uses indexes comparing characters bytewise.
+USER_EMAIL_ORDERING = (
+    func.lower(User.email, type_=String).collate("C"),
+    User.email.collate("C"),
+)
+Index("ix_user_email_lower", *USER_EMAIL_ORDERING)
 
 
 class Item(Base):
@@ -21,6 +64,61 @@ class Item(Base):
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     quantity = Column(Integer, nullable=True)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("user.id"), nullable=False)
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), nullable=False
+    )
+    # Maintained by Postgres, and deferred as only searches need it
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                f"setweight(to_tsvector('{ITEM_SEARCH_CONFIG}', coalesce(name, '')), 'A')"
+                f" || setweight(to_tsvector('{ITEM_SEARCH_CONFIG}', "
+                "coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        )
+    )
 
     user = relationship("User", back_populates="items")
+
+    __table_args__ = (
+        # Serves the per-user listings, counts and keyset pages, which filter on
+        # user_id and order by id.
+        Index("ix_items_user_id_id", "user_id", "id"),
+        Index("ix_items_search_vector", "search_vector", postgresql_using="gin"),
+        # Serves substring matches on names. The migrations install pg_trgm,
+        # create_all only adds the index where it is already installed.
+        Index(
+            "ix_items_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(callable_=has_pg_trgm),
+    )
+
+
+class UserItemStats(Base):
+    """Aggregates of a user's items, kept current by the item write paths."""
+
+    __tablename__ = "user_item_stats"
+
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), primary_key=True
+    )
+    item_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    total_quantity = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+
+class RevokedToken(Base):
+    """Access tokens revoked before they expire, by their ``jti`` claim."""
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String, primary_key=True)
+    # Expired revocations are deleted, their tokens being rejected anyway
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # Workers read the revocations made since they last did
+    revoked_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), index=True
+    )
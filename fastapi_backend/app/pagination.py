@@ -0,0 +1,147 @@
+import base64
+import binascii
+import json
+import uuid
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import ColumnElement, Select, and_, func, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .schemas import CursorPage
+
+# A keyset ordering: the columns rows are ordered by, each with a flag telling
+# whether it's sorted in descending order. The columns together must be unique.
+KeysetOrdering = Sequence[tuple[ColumnElement[Any], bool]]
+
+
+def encode_cursor(direction: str, values: Sequence[Any]) -> str:
+    payload = json.dumps([direction, list(values)], default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ordering: KeysetOrdering) -> tuple[str, list[Any]]:
+    """Decode ``cursor`` into its direction and key values.
+
+    Raises ``ValueError`` if the cursor wasn't produced for ``ordering``.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+        if (
+            direction not in ("next", "prev")
+            or not isinstance(values, list)
+            or len(values) != len(ordering)
+        ):
+            raise ValueError("Malformed cursor")
+        return direction, [
+            _key_value(column, value) for (column, _), value in zip(ordering, values)
+        ]
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError("Malformed cursor") from e
+
+
+def _key_value(column: ColumnElement[Any], value: Any) -> Any:
+    """Convert a key value decoded from JSON to the type of ``column``.
+
+    Values that can't be of the column's type are rejected here, rather than
+    by the database once the query runs.
+    """
+    python_type = _python_type(column)
+    if python_type is uuid.UUID:
+        if not isinstance(value, str):
+            raise ValueError(f"Expected a UUID, got {value!r}")
+        return uuid.UUID(value)
+    if python_type is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if python_type in (str, int, float) and type(value) is not python_type:
+        raise ValueError(f"Expected a {python_type.__name__}, got {value!r}")
+    return value
+
+
+def _python_type(column: ColumnElement[Any]) -> Optional[type]:
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def _after(ordering: KeysetOrdering, values: Sequence[Any]) -> ColumnElement[bool]:
+    """Filter for the rows that come after ``values`` in ``ordering``."""
+    if len({descending for _, descending in ordering}) == 1:
+        # Row-wise comparison, which Postgres can answer with a composite index
+        columns = tuple_(*(column for column, _ in ordering))
+        keys = tuple_(*values)
+        return columns < keys if ordering[0][1] else columns > keys
+
+    clauses = []
+    for i, (column, descending) in enumerate(ordering):
+        equal = [ordering[j][0] == values[j] for j in range(i)]
+        after = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
+
+
+async def keyset_paginate(
+    db: AsyncSession,
+    query: Select[Any],
+    ordering: KeysetOrdering,
+    cursor: Optional[str],
+    size: int,
+    *,
+    include_total: bool = False,
+    transformer: Optional[Callable[[Sequence[Any]], Sequence[Any]]] = None,
+) -> CursorPage[Any]:
+    """Paginate ``query`` by seeking past the key of the last row seen.
+
+    Unlike LIMIT/OFFSET pagination, each page costs the same no matter how deep
+    it is. ``query`` must select a single entity or column and be unordered.
+    """
+    direction = "next"
+    if cursor is not None:
+        try:
+            direction, values = decode_cursor(cursor, ordering)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    backwards = direction == "prev"
+    # Walking backwards reverses the ordering, and the page is flipped back below
+    seek_ordering = [
+        (column, descending != backwards) for column, descending in ordering
+    ]
+
+    page_query = query.add_columns(*(column for column, _ in ordering))
+    if cursor is not None:
+        page_query = page_query.filter(_after(seek_ordering, values))
+    page_query = page_query.order_by(
+        *(
+            column.desc() if descending else column.asc()
+            for column, descending in seek_ordering
+        )
+    ).limit(size + 1)
+
+    rows = (await db.execute(page_query)).all()
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+
+    keys = [row[1:] for row in rows]
+    next_cursor = previous_cursor = None
+    if rows:
+        if backwards or has_more:
+            next_cursor = encode_cursor("next", keys[-1])
+        if cursor is not None and (has_more or not backwards):
+            previous_cursor = encode_cursor("prev", keys[0])
+
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+
+    items = [row[0] for row in rows]
+    return CursorPage(
+        items=transformer(items) if transformer else items,
+        next_cursor=next_cursor,
+        previous_cursor=previous_cursor,
+        total=total,
+    )
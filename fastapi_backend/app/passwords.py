@@ -0,0 +1,42 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from fastapi_users.password import PasswordHelper
+
+from .config import settings
+
+T = TypeVar("T")
+
+password_helper = PasswordHelper()
+
+# Argon2 and bcrypt release the GIL while hashing, so a thread pool hashes in
+# parallel and keeps the event loop free. Without workers, hashing runs inline.
+password_executor: Optional[ThreadPoolExecutor] = (
+    ThreadPoolExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password"
+    )
+    if settings.PASSWORD_HASH_WORKERS > 0
+    else None
+)
+
+
+async def run_password_task(func: Callable[..., T], *args: str) -> T:
+    if password_executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(
+        password_executor, func, *args
+    )
+
+
+async def hash_password(password: str) -> str:
+    return await run_password_task(password_helper.hash, password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """Verify a password, and return its new hash if it should be rehashed."""
+    return await run_password_task(
+        password_helper.verify_and_update, plain_password, hashed_password
+    )
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .config import settings
+from .models import Item, User
+
+logger = logging.getLogger(__name__)
+
+# Purges running in this worker process, referenced until they finish
+purge_tasks: set[asyncio.Task] = set()
+
+
+async def purge_user(
+    session_maker: async_sessionmaker[AsyncSession], user_id: UUID, batch_size: int
+) -> None:
+    """Delete ``user_id``'s items ``batch_size`` at a time, then the user.
+
+    Every batch is committed on its own, so no transaction holds locks on more
+    than ``batch_size`` items. A purge that is interrupted leaves the user with
+    part of their items, deleting the user again resumes it.
+    """
+    batch = (
+        select(Item.id)
+        .where(Item.user_id == user_id)
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    while True:
+        async with session_maker() as session:
+            result = await session.execute(
+                delete(Item.__table__).where(Item.id.in_(batch))
+            )
+            await session.commit()
+        if result.rowcount < batch_size:
+            break
+
+    async with session_maker() as session:
+        await session.execute(delete(User.__table__).where(User.id == user_id))
+        await session.commit()
+
+
+async def purge_user_then(
+    session_maker: async_sessionmaker[AsyncSession],
+    user_id: UUID,
+    on_purged: Optional[Callable[[], Awaitable[None]]],
+) -> None:
+    await purge_user(session_maker, user_id, settings.USERS_PURGE_BATCH_SIZE)
+    if on_purged is not None:
+        await on_purged()
+
+
+def log_purge_failure(user_id: UUID, task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(
+            "Purging user %s failed, deleting them again resumes it",
+            user_id,
+            exc_info=task.exception(),
+        )
+
+
+def schedule_user_purge(
+    session_maker: async_sessionmaker[AsyncSession],
+    user_id: UUID,
+    on_purged: Optional[Callable[[], Awaitable[None]]] = None,
+) -> asyncio.Task:
+    """Purge ``user_id`` in the background, then await ``on_purged``.
+
+    Failures are logged, the user is then left deactivated with part of their
+    items.
+    """
+    task = asyncio.create_task(purge_user_then(session_maker, user_id, on_purged))
+    purge_tasks.add(task)
+    task.add_done_callback(purge_tasks.discard)
+    task.add_done_callback(partial(log_purge_failure, user_id))
+    return task
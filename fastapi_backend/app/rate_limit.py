@@ -0,0 +1,228 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import HTTPException, Request, status
+
+from .cache import CACHE_ERRORS, RedisCache
+from .config import settings
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """A token bucket of ``burst`` attempts, refilled at ``per_minute``."""
+
+    burst: int
+    per_minute: float
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60
+
+
+class RateLimitBackend(ABC):
+    name: str
+
+    @abstractmethod
+    async def take(self, key: str, limit: RateLimit) -> float:
+        """Take a token from the bucket of ``key``.
+
+        Return 0 if there was one, else the seconds until there will be.
+        """
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Buckets local to the worker process, the least recently used of which
+    are dropped past ``max_keys``."""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated_at) * limit.per_second)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / limit.per_second
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# Refills and takes from a bucket atomically, on the server's clock. Returns the
+# milliseconds until a token is available, 0 if one was taken.
+TAKE_TOKEN_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local per_ms = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + tonumber(time[2]) / 1000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - updated_at) * per_ms)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / per_ms)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / per_ms))
+return wait
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by every worker on a server speaking the Redis protocol."""
+
+    name = "redis"
+
+    def __init__(self, redis: RedisCache) -> None:
+        self.redis = redis
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        wait_ms = await self.redis.execute(
+            "EVAL",
+            TAKE_TOKEN_SCRIPT,
+            1,
+            f"rate_limit:{key}",
+            limit.burst,
+            repr(limit.per_second / 1000),
+        )
+        return wait_ms / 1000
+
+
+class AuthRateLimiter:
+    """Limits authentication attempts per client IP and per e-mail.
+
+    When the backend is unavailable, attempts are limited by the ``fallback``
+    backend, typically buckets local to the worker, or let through without
+    one: rejecting every login would be worse than not limiting them for a
+    while.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        ip_limit: RateLimit,
+        email_limit: RateLimit,
+        fallback: Optional[RateLimitBackend] = None,
+    ) -> None:
+        self.backend = backend
+        self.ip_limit = ip_limit
+        self.email_limit = email_limit
+        self.fallback = fallback
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    async def check(self, ip: Optional[str], email: Optional[str]) -> float:
+        """Count an attempt, and return the seconds to wait if it's rejected."""
+        buckets = []
+        if ip is not None:
+            buckets.append((f"ip:{ip}", self.ip_limit))
+        if email is not None:
+            buckets.append((f"email:{email.strip().lower()}", self.email_limit))
+
+        for key, limit in buckets:
+            try:
+                wait = await self.backend.take(key, limit)
+            except CACHE_ERRORS:
+                self.errors += 1
+                if self.fallback is None:
+                    continue
+                wait = await self.fallback.take(key, limit)
+            if wait > 0:
+                self.rejected += 1
+                return wait
+        self.allowed += 1
+        return 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+def create_auth_rate_limiter() -> Optional[AuthRateLimiter]:
+    fallback: Optional[RateLimitBackend] = None
+    if settings.AUTH_RATE_LIMIT_BACKEND == "memory":
+        backend: RateLimitBackend = InMemoryRateLimitBackend(
+            settings.AUTH_RATE_LIMIT_MAX_KEYS
+        )
+    elif settings.AUTH_RATE_LIMIT_BACKEND == "redis":
+        # Without Redis, each worker limits the attempts it sees
+        fallback = InMemoryRateLimitBackend(settings.AUTH_RATE_LIMIT_MAX_KEYS)
+        backend = RedisRateLimitBackend(
+            RedisCache(
+                settings.AUTH_RATE_LIMIT_URL,
+                settings.REDIS_TIMEOUT_SECONDS,
+                settings.REDIS_MAX_CONNECTIONS,
+            )
+        )
+    else:
+        return None
+    return AuthRateLimiter(
+        backend,
+        ip_limit=RateLimit(
+            settings.AUTH_RATE_LIMIT_IP_BURST, settings.AUTH_RATE_LIMIT_IP_PER_MINUTE
+        ),
+        email_limit=RateLimit(
+            settings.AUTH_RATE_LIMIT_EMAIL_BURST,
+            settings.AUTH_RATE_LIMIT_EMAIL_PER_MINUTE,
+        ),
+        fallback=fallback,
+    )
+
+
+auth_rate_limiter = create_auth_rate_limiter()
+
+
+async def get_attempted_email(request: Request) -> Optional[str]:
+    """Return the e-mail of a login form or registration body, if any.
+
+    The body has already been parsed for the route, so this reads it from the
+    request's cache.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            email = (await request.form()).get("username")
+        else:
+            body = await request.json()
+            email = body.get("email") if isinstance(body, dict) else None
+    except ValueError:
+        return None
+    return email if isinstance(email, str) else None
+
+
+async def limit_auth_attempts(request: Request) -> None:
+    """Reject authentication attempts past the limits with a 429.
+
+    Route dependencies are solved before the endpoint's, so rejected attempts
+    cost no user lookup and no password hashing.
+    """
+    limiter = auth_rate_limiter
+    if limiter is None:
+        return
+    ip = request.client.host if request.client is not None else None
+    wait = await limiter.check(ip, await get_attempted_email(request))
+    if wait > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, try again later.",
+            headers={"Retry-After": str(max(math.ceil(wait), 1))},
+        )
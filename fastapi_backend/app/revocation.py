@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Iterable, Optional, Sequence
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .config import settings
+from .database import async_session_maker
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# revoked_at is the start of the revoking transaction, which may commit after
+# later revocations were read. Refreshes read back this far to catch those.
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """Set membership with false positives at ``error_rate`` up to ``capacity``
+    items, and no false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = max(
+            math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2), 8
+        )
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self._bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8]), int.from_bytes(digest[8:]) | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationList:
+    """Revoked access tokens, by ``jti``, stored in Postgres and mirrored in
+    the worker process.
+
+    The mirror is a Bloom filter of the unexpired revocations, so tokens that
+    aren't revoked are told apart without a query. Tokens the filter matches
+    are looked up, and the answers kept in a small exact LRU. Revocations from
+    other workers are picked up by ``refresh``.
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        capacity: int,
+        error_rate: float = 0.01,
+        known_size: int = 10_000,
+    ) -> None:
+        self.session_maker = session_maker
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.known_size = known_size
+        self.filter = BloomFilter(capacity, error_rate)
+        self.lookups = 0
+        self.checks = 0
+        self._known: OrderedDict[str, bool] = OrderedDict()
+        self._refreshed_to: Optional[datetime] = None
+        self._revoked_meanwhile: Optional[list[str]] = None
+
+    def _remember(self, jti: str, revoked: bool) -> None:
+        self._known[jti] = revoked
+        self._known.move_to_end(jti)
+        while len(self._known) > self.known_size:
+            self._known.popitem(last=False)
+
+    async def is_revoked(self, jti: str) -> bool:
+        self.checks += 1
+        if jti not in self.filter:
+            return False
+        revoked = self._known.get(jti)
+        if revoked is None:
+            self.lookups += 1
+            async with self.session_maker() as session:
+                revoked = (
+                    await session.scalar(
+                        select(RevokedToken.jti).where(RevokedToken.jti == jti)
+                    )
+                    is not None
+                )
+            self._remember(jti, revoked)
+        return revoked
+
+    async def revoke(self, jti: str, expires_at: datetime) -> None:
+        async with self.session_maker() as session:
+            await session.execute(
+                insert(RevokedToken)
+                .values(jti=jti, expires_at=expires_at)
+                .on_conflict_do_nothing()
+            )
+            await session.commit()
+        self.filter.add(jti)
+        self._remember(jti, True)
+        if self._revoked_meanwhile is not None:
+            self._revoked_meanwhile.append(jti)
+
+    async def refresh(self) -> None:
+        """Add the revocations made since the last refresh to the mirror."""
+        rows = await self._read_revocations(self._refreshed_to)
+        for jti, revoked_at in rows:
+            self.filter.add(jti)
+            self._remember(jti, True)
+            if self._refreshed_to is None or revoked_at > self._refreshed_to:
+                self._refreshed_to = revoked_at
+
+    async def rebuild(self) -> None:
+        """Replace the mirror with the unexpired revocations.
+
+        Expired revocations are deleted, since their tokens are rejected
+        anyway. The current mirror answers until the new one is complete.
+        """
+        async with self.session_maker() as session:
+            await session.execute(
+                delete(RevokedToken).where(RevokedToken.expires_at <= func.now())
+            )
+            await session.commit()
+
+        # Revocations made by this worker while the revocations are read may
+        # not be among them
+        revoked_meanwhile = self._revoked_meanwhile = []
+        try:
+            rows = await self._read_revocations(None)
+        finally:
+            self._revoked_meanwhile = None
+
+        bloom_filter = BloomFilter(self.capacity, self.error_rate)
+        known: OrderedDict[str, bool] = OrderedDict()
+        refreshed_to = None
+        for jti, revoked_at in rows:
+            bloom_filter.add(jti)
+            known[jti] = True
+            if refreshed_to is None or revoked_at > refreshed_to:
+                refreshed_to = revoked_at
+        for jti in revoked_meanwhile:
+            bloom_filter.add(jti)
+            known[jti] = True
+        while len(known) > self.known_size:
+            known.popitem(last=False)
+        self.filter, self._known, self._refreshed_to = bloom_filter, known, refreshed_to
+
+    async def _read_revocations(
+        self, since: Optional[datetime]
+    ) -> Sequence[tuple[str, datetime]]:
+        query = select(RevokedToken.jti, RevokedToken.revoked_at)
+        if since is not None:
+            query = query.where(RevokedToken.revoked_at >= since - REFRESH_OVERLAP)
+        async with self.session_maker() as session:
+            return (await session.execute(query)).tuples().all()
+
+    def stats(self) -> dict[str, Any]:
+        return {"checks": self.checks, "lookups": self.lookups}
+
+
+revocation_list = RevocationList(
+    async_session_maker, settings.TOKEN_REVOCATION_CAPACITY
+)
+
+
+@asynccontextmanager
+async def keep_revocations_fresh() -> AsyncIterator[None]:
+    """Refresh the revocation list in the background while the context is open.
+
+    The list is rebuilt every ``ACCESS_TOKEN_EXPIRE_SECONDS``, after which all
+    revocations it held before have expired. It's first built on entering, and
+    if that fails, say the database is briefly down, at the next refresh: the
+    app starts anyway, without rejecting the tokens revoked so far meanwhile.
+    """
+
+    async def rebuild() -> bool:
+        try:
+            await revocation_list.rebuild()
+        except Exception:
+            logger.exception("Rebuilding the token revocation list failed")
+            return False
+        return True
+
+    async def refresh_periodically(rebuilt_at: Optional[float]):
+        while True:
+            await asyncio.sleep(settings.TOKEN_REVOCATION_REFRESH_SECONDS)
+            if (
+                rebuilt_at is None
+                or time.monotonic() - rebuilt_at >= settings.ACCESS_TOKEN_EXPIRE_SECONDS
+            ):
+                if await rebuild():
+                    rebuilt_at = time.monotonic()
+            else:
+                try:
+                    await revocation_list.refresh()
+                except Exception:
+                    logger.exception("Refreshing the token revocation list failed")
+
+    rebuilt_at = time.monotonic() if await rebuild() else None
+    task = asyncio.create_task(refresh_periodically(rebuilt_at))
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def token_expiry(data: dict[str, Any]) -> datetime:
+    """Return when the token of payload ``data`` expires."""
+    if "exp" in data:
+        return datetime.fromtimestamp(data["exp"], timezone.utc)
+    return datetime.now(timezone.utc) + timedelta(
+        seconds=settings.ACCESS_TOKEN_EXPIRE_SECONDS
+    )
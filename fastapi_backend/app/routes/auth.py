@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+from fastapi_users.authentication import Strategy
+from fastapi_users.authentication.transport.bearer import BearerResponse
+
+from app.models import User
+from app.users import auth_backend, current_active_user_for_refresh
+
+router = APIRouter(tags=["auth"])
+
+
+@router.post("/refresh", response_model=BearerResponse)
+async def refresh_token(
+    user: User = Depends(current_active_user_for_refresh),
+    strategy: Strategy = Depends(auth_backend.get_strategy),
+):
+    """Issue a new access token, with claims re-read from the database."""
+    return await auth_backend.login(strategy, user)
@@ -1,33 +1,526 @@
-from uuid import UUID
+import csv
+import io
+import json
+import re
+import zlib
+from math import ceil
+from typing import AsyncIterator, Sequence
+from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi_pagination import Page, Params
-from fastapi_pagination.ext.sqlalchemy import apaginate
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi_pagination import Params
+from fastapi_pagination.ext.sqlalchemy import create_paginate_query
+from pydantic import ValidationError
+from pydantic_core import to_json
+from sqlalchemy import (
+    ARRAY,
+    ColumnElement,
+    Float,
+    Row,
+    Update,
+    any_,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import websearch_to_tsquery
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from app.database import User, get_async_session
-from app.models import Item
-from app.schemas import ItemRead, ItemCreate
-from app.users import current_active_user
+from app import cache
+from app.config import settings
+from app.counts import count_items, update_item_stats
+from app.database import User, copy_records, get_async_session, mark_recent_write
+from app.models import ITEM_SEARCH_CONFIG, Item, UserItemStats, has_pg_trgm
+from app.pagination import keyset_paginate
+from app.schemas import (
+    CountedPage,
+    CountStrategy,
+    CursorPage,
+    ExportFormat,
+    ItemBulkDelete,
+    ItemBulkDeleteResult,
+    ItemImportError,
+    ItemImportResult,
+    ItemRead,
+    ItemCreate,
+    ItemSparseRead,
+    ItemStats,
+)
+from app.streaming import RecordTooLong, iter_csv_records, iter_lines
+from app.users import (
+    UserClaims,
+    current_active_claims,
+    current_active_user,
+    get_user_read_session,
+)
 
 router = APIRouter(tags=["item"])
 
 
+ITEM_COLUMNS = ("id", "name", "description", "quantity", "user_id")
+
+
 def transform_items(items):
     return [ItemRead.model_validate(item) for item in items]
 
 
-@router.get("/", response_model=Page[ItemRead])
+def parse_item_fields(fields: str | None) -> Sequence[str]:
+    """Return the item columns of a comma separated list of ``ItemRead`` fields.
+
+    The id is always included, to keep items addressable.
+    """
+    if fields is None:
+        return ITEM_COLUMNS
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(ItemRead.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return [column for column in ITEM_COLUMNS if column == "id" or column in requested]
+
+
+def item_rows_page_response(
+    rows: Sequence[Row],
+    total: int | None,
+    params: Params,
+    count: CountStrategy,
+    columns: Sequence[str] = ITEM_COLUMNS,
+) -> Response:
+    """Encode a page of item rows, holding ``columns``, straight to JSON.
+
+    This is the ``CountedPage[ItemRead]`` payload, ``CountedPage[ItemSparseRead]``
+    with fewer columns, without validating each row into a model and the page
+    again against the response model.
+    """
+    page = {
+        "items": [dict(zip(columns, row)) for row in rows],
+        "total": total,
+        "page": params.page,
+        "size": params.size,
+        "pages": ceil(total / params.size) if total is not None else None,
+        "count_strategy": count,
+    }
+    return Response(to_json(page), media_type="application/json")
+
+
+def bump_items_version(user_id: UUID) -> Update:
+    """Change the version of ``user_id``'s items, in the transaction writing them.
+
+    Statements writing items attach this as a CTE, to keep to one round trip.
+    """
+    return (
+        update(User.__table__)
+        .where(User.__table__.c.id == user_id)
+        .values(items_version=User.__table__.c.items_version + 1)
+    )
+
+
+async def items_changed(user_id: UUID) -> None:
+    """Update the per-user read state after ``user_id``'s items changed."""
+    await mark_recent_write(user_id)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weakly compare ``etag`` with the tags of an If-None-Match header."""
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+@router.get("/", response_model=CountedPage[ItemRead] | CountedPage[ItemSparseRead])
 async def read_item(
-    db: AsyncSession = Depends(get_async_session),
-    user: User = Depends(current_active_user),
+    response: Response,
+    db: AsyncSession = Depends(get_user_read_session),
+    user: UserClaims = Depends(current_active_claims),
+    if_none_match: str | None = Header(
+        None, description="ETag of the page the client already has"
+    ),
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(10, ge=1, le=100, description="Page size"),
+    count: CountStrategy = Query(
+        CountStrategy(settings.ITEMS_COUNT_STRATEGY),
+        description="How the total is counted, only 'exact' is always accurate",
+    ),
+    fields: str | None = Query(
+        None,
+        description="Comma separated item fields to return, the id is always included",
+    ),
 ):
+    columns = parse_item_fields(fields)
+
+    # The version is read before the page, so that a page can only be newer
+    # than the version it's tagged with, never older
+    version = await db.scalar(select(User.items_version).where(User.id == user.id))
+    headers = {"ETag": f'W/"{user.id.hex}-{version}"'}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    page_cache = cache.item_page_cache
+    cache_key = None
+    if page_cache is not None:
+        # Keyed by the version the ETag carries, see ItemPageCache
+        cache_key = page_cache.page_key(
+            user.id, version, page, size, count.value, ",".join(columns)
+        )
+        cached = await page_cache.get(cache_key)
+        if cached is not None:
+            return Response(cached, media_type="application/json", headers=headers)
+
     params = Params(page=page, size=size)
+    total = await count_items(db, user.id, count, version)
+
+    # Sparse items are only described by ItemSparseRead, so they always take
+    # the path that skips the response model
+    if settings.ITEMS_FAST_SERIALIZATION or fields is not None:
+        query = select(*(getattr(Item, column) for column in columns)).filter(
+            Item.user_id == user.id
+        )
+        rows = (await db.execute(create_paginate_query(query, params))).all()
+        result = item_rows_page_response(rows, total, params, count, columns)
+        result.headers.update(headers)
+    else:
+        query = select(Item).filter(Item.user_id == user.id)
+        items = (await db.scalars(create_paginate_query(query, params))).all()
+        # Created by name, the response model is a union that add_pagination
+        # can't take the page type from
+        result = CountedPage[ItemRead].create(
+            transform_items(items), params, total=total, count_strategy=count
+        )
+
+    if cache_key is None:
+        return result
+
+    body = result.body if isinstance(result, Response) else to_json(result)
+    await page_cache.set(cache_key, body)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.get("/cursor", response_model=CursorPage[ItemRead])
+async def read_item_cursor(
+    db: AsyncSession = Depends(get_user_read_session),
+    user: UserClaims = Depends(current_active_claims),
+    cursor: str | None = Query(None, description="Cursor of the page to read"),
+    size: int = Query(10, ge=1, le=100, description="Page size"),
+    include_total: bool = Query(False, description="Count all the user's items"),
+):
     query = select(Item).filter(Item.user_id == user.id)
-    return await apaginate(db, query, params, transformer=transform_items)
+    return await keyset_paginate(
+        db,
+        query,
+        [(Item.id, False)],
+        cursor,
+        size,
+        include_total=include_total,
+        transformer=transform_items,
+    )
+
+
+@router.get("/stats", response_model=ItemStats)
+async def read_item_stats(
+    db: AsyncSession = Depends(get_user_read_session),
+    user: UserClaims = Depends(current_active_claims),
+):
+    """Read the user's item count and total quantity, maintained by writes."""
+    stats = (
+        await db.execute(
+            select(UserItemStats.item_count, UserItemStats.total_quantity).where(
+                UserItemStats.user_id == user.id
+            )
+        )
+    ).first()
+    if stats is None:
+        return ItemStats(item_count=0, total_quantity=0)
+    return ItemStats(item_count=stats.item_count, total_quantity=stats.total_quantity)
+
+
+# Whether pg_trgm is installed, looked up on the first search of the process
+_pg_trgm_installed: bool | None = None
+
+# Quotes, "-" and "or" of the web search syntax, which trigrams can't express:
+# "chair -blue" has the same trigrams as "Blue chair"
+WEBSEARCH_OPERATORS = re.compile(r'"|(?:^|\s)-|\bor\b', re.IGNORECASE)
+
+
+async def pg_trgm_installed(db: AsyncSession) -> bool:
+    global _pg_trgm_installed
+    if _pg_trgm_installed is None:
+        _pg_trgm_installed = await db.run_sync(
+            lambda session: has_pg_trgm(None, None, session.connection())
+        )
+    return _pg_trgm_installed
+
+
+@router.get("/search", response_model=CursorPage[ItemRead])
+async def search_items(
+    db: AsyncSession = Depends(get_user_read_session),
+    user: UserClaims = Depends(current_active_claims),
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms"),
+    cursor: str | None = Query(None, description="Cursor of the page to read"),
+    size: int = Query(10, ge=1, le=100, description="Page size"),
+):
+    """Search the user's items by name and description, best matches first.
+
+    The terms are matched as words, in web search syntax (quotes, ``or`` and
+    ``-``), and as a whole as a substring of names, which rank last. With
+    pg_trgm, terms without that syntax also match names they are similar to,
+    misspelled, ranked by how similar they are.
+    """
+    tsquery = websearch_to_tsquery(ITEM_SEARCH_CONFIG, q)
+    # Typed, so that cursors carrying anything but a float rank are rejected
+    # before the query is built
+    rank = func.ts_rank(Item.search_vector, tsquery, type_=Float)
+    matches = [
+        Item.search_vector.bool_op("@@")(tsquery),
+        Item.name.icontains(q, autoescape=True),
+    ]
+    if not WEBSEARCH_OPERATORS.search(q) and await pg_trgm_installed(db):
+        # The similarity of q to the most similar words of the name, which
+        # ix_items_name_trgm serves. The whole names' similarity would drop
+        # with every word they have that q doesn't.
+        matches.append(Item.name.bool_op("%>")(q))
+        rank = rank + func.word_similarity(q, Item.name, type_=Float)
+    query = select(Item).filter(Item.user_id == user.id, or_(*matches))
+    return await keyset_paginate(
+        db,
+        query,
+        [(rank, True), (Item.id, False)],
+        cursor,
+        size,
+        transformer=transform_items,
+    )
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def accepts_gzip(request: Request) -> bool:
+    for encoding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = encoding.partition(";")
+        if name.strip().lower() == "gzip":
+            _, _, quality = params.partition("q=")
+            try:
+                return float(quality or 1) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def encode_export_rows(rows: Sequence[Row], export_format: ExportFormat) -> bytes:
+    if export_format == ExportFormat.csv:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    return "".join(
+        json.dumps(dict(row._mapping), default=str) + "\n" for row in rows
+    ).encode()
+
+
+async def stream_items_export(
+    db: AsyncSession, user_id: UUID, export_format: ExportFormat, compress: bool
+) -> AsyncIterator[bytes]:
+    """Stream the items of ``user_id`` in batches read from a server-side cursor.
+
+    Only one batch is held in memory at a time, however many items there are.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+
+    def encode(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    try:
+        if export_format == ExportFormat.csv:
+            yield encode((",".join(ITEM_COLUMNS) + "\r\n").encode())
+
+        result = await db.stream(
+            select(*(getattr(Item, column) for column in ITEM_COLUMNS))
+            .filter(Item.user_id == user_id)
+            .order_by(Item.id)
+            .execution_options(yield_per=settings.ITEMS_EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            chunk = encode(encode_export_rows(rows, export_format))
+            if chunk:
+                yield chunk
+
+        if compressor:
+            yield compressor.flush()
+    finally:
+        # The session dependency is torn down before the response body is
+        # sent, so the connection opened by the stream is released here.
+        await db.close()
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}
+    },
+)
+async def export_items(
+    request: Request,
+    db: AsyncSession = Depends(get_user_read_session),
+    user: UserClaims = Depends(current_active_claims),
+    export_format: ExportFormat = Query(
+        ExportFormat.ndjson, alias="format", description="Export file format"
+    ),
+):
+    compress = accepts_gzip(request)
+    headers = {
+        "Content-Disposition": f'attachment; filename="items.{export_format.value}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        stream_items_export(db, user.id, export_format, compress),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers=headers,
+    )
+
+
+IMPORT_FORMATS = {
+    media_type: file_format for file_format, media_type in EXPORT_MEDIA_TYPES.items()
+}
+
+
+def format_validation_errors(error: ValidationError) -> list[str]:
+    return [
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    ]
+
+
+async def parse_import_items(
+    chunks: AsyncIterator[bytes], file_format: ExportFormat
+) -> AsyncIterator[tuple[int, ItemCreate | list[str]]]:
+    """Parse an uploaded file into items, or the errors of the invalid rows.
+
+    Rows are yielded with their line number as soon as they are complete.
+    Raises ``RecordTooLong`` past ``ITEMS_IMPORT_MAX_RECORD_LENGTH``.
+    """
+    max_length = settings.ITEMS_IMPORT_MAX_RECORD_LENGTH
+    # CSV line ends are kept, as part of the quoted fields spanning lines
+    lines = iter_lines(chunks, max_length, keepends=file_format == ExportFormat.csv)
+
+    if file_format == ExportFormat.ndjson:
+        async for number, line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield number, ItemCreate.model_validate_json(line)
+            except ValidationError as e:
+                yield number, format_validation_errors(e)
+        return
+
+    header = None
+    async for number, values in iter_csv_records(lines, max_length):
+        if header is None:
+            header = values
+            continue
+        if len(values) != len(header):
+            yield number, [f"row: Expected {len(header)} fields, got {len(values)}"]
+            continue
+        try:
+            yield (
+                number,
+                ItemCreate.model_validate(
+                    {key: value or None for key, value in zip(header, values)}
+                ),
+            )
+        except ValidationError as e:
+            yield number, format_validation_errors(e)
+
+
+@router.post(
+    "/import",
+    response_model=ItemImportResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {"schema": {"type": "string"}}
+                for media_type in IMPORT_FORMATS
+            },
+        }
+    },
+)
+async def import_items(
+    request: Request,
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user),
+):
+    """Import items from a CSV or NDJSON body as it is being uploaded.
+
+    Valid rows are loaded with COPY in batches of ``ITEMS_IMPORT_BATCH_SIZE``
+    and committed together at the end, invalid rows are reported back.
+    """
+    content_type = request.headers.get("content-type", "").partition(";")[0]
+    file_format = IMPORT_FORMATS.get(content_type.strip().lower())
+    if file_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Expected one of {', '.join(IMPORT_FORMATS)} content types",
+        )
+
+    imported = imported_quantity = failed = 0
+    errors: list[ItemImportError] = []
+    batch: list[tuple] = []
+
+    rows = parse_import_items(request.stream(), file_format)
+    try:
+        async for number, item in rows:
+            if isinstance(item, ItemCreate):
+                batch.append(
+                    (uuid4(), item.name, item.description, item.quantity, user.id)
+                )
+                imported_quantity += item.quantity or 0
+            else:
+                failed += 1
+                if len(errors) < settings.ITEMS_IMPORT_MAX_ERRORS:
+                    errors.append(ItemImportError(line=number, errors=item))
+
+            if len(batch) >= settings.ITEMS_IMPORT_BATCH_SIZE:
+                await copy_records(db, Item.__table__, ITEM_COLUMNS, batch)
+                imported += len(batch)
+                batch = []
+    except UnicodeDecodeError as e:
+        # Nothing is committed, so the batches already copied are rolled back
+        raise HTTPException(
+            status_code=400, detail="The body is not UTF-8 encoded"
+        ) from e
+    except RecordTooLong as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    if batch:
+        await copy_records(db, Item.__table__, ITEM_COLUMNS, batch)
+        imported += len(batch)
+
+    if imported:
+        await db.execute(
+            update_item_stats(user.id, imported, imported_quantity).add_cte(
+                bump_items_version(user.id).cte()
+            )
+        )
+    await db.commit()
+    if imported:
+        await items_changed(user.id)
+
+    return ItemImportResult(imported=imported, failed=failed, errors=errors)
 
 
 @router.post("/", response_model=ItemRead)
@@ -36,28 +529,116 @@ async def create_item(
     db: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_active_user),
 ):
-    db_item = Item(**item.model_dump(), user_id=user.id)
-    db.add(db_item)
+    """Create an item, reading it back from the INSERT itself.
+
+    The response is built before committing, so neither a refresh nor an
+    attribute reload after the commit expires the instance is needed.
+    """
+    result = await db.execute(
+        insert(Item.__table__)
+        .values(id=uuid4(), **item.model_dump(), user_id=user.id)
+        .returning(*Item.__table__.c[ITEM_COLUMNS])
+        .add_cte(bump_items_version(user.id).cte())
+        .add_cte(update_item_stats(user.id, 1, item.quantity or 0).cte())
+    )
+    created = ItemRead.model_validate(result.one())
     await db.commit()
-    await db.refresh(db_item)
-    return db_item
+    await items_changed(user.id)
+    return created
 
 
-@router.delete("/{item_id}")
-async def delete_item(
-    item_id: UUID,
+@router.post("/bulk", response_model=list[ItemRead])
+async def create_items_bulk(
+    items: list[ItemCreate] = Body(
+        ..., min_length=1, max_length=settings.ITEMS_BULK_MAX_SIZE
+    ),
     db: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_active_user),
 ):
+    """Create all of ``items`` in one transaction, or none of them."""
+    rows = [{"id": uuid4(), **item.model_dump(), "user_id": user.id} for item in items]
+
+    if len(rows) >= settings.ITEMS_BULK_COPY_THRESHOLD:
+        # The ids are generated here, so the rows need nothing back from COPY
+        await copy_records(
+            db, Item.__table__, list(rows[0]), [tuple(row.values()) for row in rows]
+        )
+        created = rows
+    else:
+        result = await db.execute(
+            insert(Item.__table__).returning(
+                *Item.__table__.c[ITEM_COLUMNS], sort_by_parameter_order=True
+            ),
+            rows,
+        )
+        created = result.mappings().all()
+
+    await db.execute(
+        update_item_stats(
+            user.id, len(rows), sum(row["quantity"] or 0 for row in rows)
+        ).add_cte(bump_items_version(user.id).cte())
+    )
+    await db.commit()
+    await items_changed(user.id)
+    return created
+
+
+async def delete_items(
+    db: AsyncSession, user_id: UUID, *filters: ColumnElement[bool]
+) -> list[UUID]:
+    """Delete ``user_id``'s items matching ``filters`` in a single statement.
+
+    The statement also takes the deleted items out of the user's stats.
+    """
+    deleted = (
+        delete(Item.__table__)
+        .where(Item.user_id == user_id, *filters)
+        .returning(Item.id, Item.quantity)
+        .cte("deleted_items")
+    )
+    stats = update_item_stats(
+        user_id,
+        -select(func.count()).select_from(deleted).scalar_subquery(),
+        -select(func.coalesce(func.sum(deleted.c.quantity), 0)).scalar_subquery(),
+    )
+    # Deleting nothing leaves the version, and with it ETags and cached pages
+    version = bump_items_version(user_id).where(select(deleted.c.id).exists())
     result = await db.execute(
-        select(Item).filter(Item.id == item_id, Item.user_id == user.id)
+        select(deleted.c.id).add_cte(stats.cte()).add_cte(version.cte())
     )
-    item = result.scalars().first()
+    return list(result.scalars())
+
 
-    if not item:
+@router.post("/bulk-delete", response_model=ItemBulkDeleteResult)
+async def delete_items_bulk(
+    item_filter: ItemBulkDelete,
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user),
+):
+    filters = []
+    if item_filter.ids is not None:
+        filters.append(Item.id == any_(literal(item_filter.ids, ARRAY(Item.id.type))))
+    if item_filter.name is not None:
+        filters.append(Item.name == item_filter.name)
+
+    deleted_ids = await delete_items(db, user.id, *filters)
+    await db.commit()
+    if deleted_ids:
+        await items_changed(user.id)
+
+    return ItemBulkDeleteResult(deleted_ids=deleted_ids)
+
+
+@router.delete("/{item_id}")
+async def delete_item(
+    item_id: UUID,
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user),
+):
+    if not await delete_items(db, user.id, Item.id == item_id):
         raise HTTPException(status_code=404, detail="Item not found or not authorized")
 
-    await db.delete(item)
     await db.commit()
+    await items_changed(user.id)
 
     return {"message": "Item successfully deleted"}
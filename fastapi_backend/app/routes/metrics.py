@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+
+from app import cache, rate_limit
+from app.database import User, get_pool_stats
+from app.users import current_superuser, jwt_strategy
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/")
+async def read_metrics(user: User = Depends(current_superuser)):
+    page_cache = cache.item_page_cache
+    user_cache = cache.user_cache
+    limiter = rate_limit.auth_rate_limiter
+    return {
+        "database_pool": get_pool_stats(),
+        "items_cache": page_cache.stats() if page_cache is not None else None,
+        "users_cache": user_cache.stats() if user_cache is not None else None,
+        "auth_rate_limit": limiter.stats() if limiter is not None else None,
+        "access_token_cache": jwt_strategy.stats(),
+        "token_revocations": jwt_strategy.revocations.stats(),
+    }
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.database import get_read_async_session
+from app.models import USER_EMAIL_ORDERING, User, UserItemStats
+from app.pagination import keyset_paginate
+from app.schemas import CursorPage, UserListRead
+from app.users import current_superuser
+
+router = APIRouter(tags=["users"])
+
+
+@router.get("/", response_model=CursorPage[UserListRead])
+async def read_users(
+    db: AsyncSession = Depends(get_read_async_session),
+    user: User = Depends(current_superuser),
+    cursor: str | None = Query(None, description="Cursor of the page to read"),
+    size: int = Query(50, ge=1, le=100, description="Page size"),
+    include_total: bool = Query(False, description="Count all the matching users"),
+    is_active: bool | None = Query(None),
+    is_verified: bool | None = Query(None),
+    email_prefix: str | None = Query(None, min_length=1),
+    include_item_count: bool = Query(
+        False, description="Include the number of items of each user"
+    ),
+):
+    """List users by e-mail, for superusers."""
+    query = select(User)
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    if is_verified is not None:
+        query = query.filter(User.is_verified == is_verified)
+    if email_prefix is not None:
+        # A LIKE prefix match, a range scan of ix_user_email_lower
+        query = query.filter(
+            USER_EMAIL_ORDERING[0].startswith(email_prefix.lower(), autoescape=True)
+        )
+
+    page = await keyset_paginate(
+        db,
+        query,
+        [(column, False) for column in USER_EMAIL_ORDERING],
+        cursor,
+        size,
+        include_total=include_total,
+    )
+
+    item_counts = {}
+    if include_item_count and page.items:
+        # One lookup of the maintained stats for the whole page
+        result = await db.execute(
+            select(UserItemStats.user_id, UserItemStats.item_count).where(
+                UserItemStats.user_id.in_([listed.id for listed in page.items])
+            )
+        )
+        item_counts = dict(result.tuples().all())
+
+    page.items = [
+        UserListRead.model_validate(listed).model_copy(
+            update={"item_count": item_counts.get(listed.id, 0)}
+            if include_item_count
+            else {}
+        )
+        for listed in page.items
+    ]
+    return page
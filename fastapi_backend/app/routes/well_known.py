@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Response
+
+from app.users import jwt_strategy
+
+router = APIRouter(tags=["auth"])
+
+
+@router.get("/jwks.json")
+async def read_jwks(response: Response):
+    """Public keys access tokens can be verified with, by key id.
+
+    The set is empty when tokens are signed with a shared secret.
+    """
+    response.headers["Cache-Control"] = "public, max-age=300"
+    signing_keys = jwt_strategy.signing_keys
+    return signing_keys.jwks() if signing_keys is not None else {"keys": []}
@@ -1,14 +1,25 @@
 import uuid
+from enum import Enum
+from typing import Generic, TypeVar
 
+from fastapi_pagination import Page
 from fastapi_users import schemas
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from uuid import UUID
 
+from .config import settings
+
+T = TypeVar("T")
+
 
 class UserRead(schemas.BaseUser[uuid.UUID]):
     pass
 
 
+class UserListRead(UserRead):
+    item_count: int | None = None
+
+
 class UserCreate(schemas.BaseUserCreate):
     pass
 
@@ -32,3 +43,69 @@ class ItemRead(ItemBase):
     user_id: UUID
 
     model_config = {"from_attributes": True}
+
+
+class ItemSparseRead(BaseModel):
+    # An item holding only the fields a client selected, and always its id
+    id: UUID
+    name: str | None = None
+    description: str | None = None
+    quantity: int | None = None
+    user_id: UUID | None = None
+
+
+class ItemStats(BaseModel):
+    item_count: int
+    total_quantity: int
+
+
+class ItemBulkDelete(BaseModel):
+    # The given filters are combined, and at least one of them is required
+    ids: list[UUID] | None = Field(
+        None, min_length=1, max_length=settings.ITEMS_BULK_MAX_SIZE
+    )
+    name: str | None = None
+
+    @model_validator(mode="after")
+    def check_filters(self):
+        if self.ids is None and self.name is None:
+            raise ValueError("Either ids or name must be given.")
+        return self
+
+
+class ItemBulkDeleteResult(BaseModel):
+    deleted_ids: list[UUID]
+
+
+class ItemImportError(BaseModel):
+    line: int
+    errors: list[str]
+
+
+class ItemImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ItemImportError]
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+    total: int | None = None
+
+
+class CountStrategy(str, Enum):
+    exact = "exact"
+    cached = "cached"
+    estimate = "estimate"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class CountedPage(Page[T], Generic[T]):
+    # Only an "exact" count is guaranteed to match the number of rows
+    count_strategy: CountStrategy
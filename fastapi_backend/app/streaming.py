@@ -0,0 +1,97 @@
+import codecs
+import csv
+from typing import AsyncIterable, AsyncIterator, Optional
+
+
+class RecordTooLong(ValueError):
+    """A line or record, starting at line ``number``, is over the length cap."""
+
+    def __init__(self, number: int, max_length: int):
+        super().__init__(f"Line {number} is longer than {max_length} characters")
+        self.number = number
+        self.max_length = max_length
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes],
+    max_length: Optional[int] = None,
+    *,
+    keepends: bool = False,
+) -> AsyncIterator[tuple[int, str]]:
+    """Split a stream of UTF-8 encoded chunks into numbered lines.
+
+    Only the current incomplete line is buffered between chunks, up to
+    ``max_length`` characters. Lines end with "\\n" or "\\r\\n", which are only
+    kept with ``keepends``. A leading byte order mark, which Excel writes, is
+    dropped. Raises ``UnicodeDecodeError`` on bytes that aren't UTF-8, and
+    ``RecordTooLong`` on longer lines.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    number = 0
+    # The parts of the incomplete line, joined once it's complete
+    pending: list[str] = []
+    pending_length = 0
+
+    def complete(line: str) -> str:
+        if max_length is not None and len(line.rstrip("\r\n")) > max_length:
+            raise RecordTooLong(number, max_length)
+        return line if keepends else line.removesuffix("\n").removesuffix("\r")
+
+    async for chunk in chunks:
+        *ends, rest = decoder.decode(chunk).split("\n")
+        for end in ends:
+            pending.append(end + "\n")
+            number += 1
+            yield number, complete("".join(pending))
+            pending = []
+            pending_length = 0
+        if rest:
+            pending.append(rest)
+            pending_length += len(rest)
+            if max_length is not None and pending_length > max_length + 1:
+                raise RecordTooLong(number + 1, max_length)
+
+    pending.append(decoder.decode(b"", final=True))
+    line = "".join(pending)
+    if line:
+        number += 1
+        yield number, complete(line)
+
+
+async def iter_csv_records(
+    lines: AsyncIterable[tuple[int, str]],
+    max_length: Optional[int] = None,
+) -> AsyncIterator[tuple[int, list[str]]]:
+    """Parse numbered lines into CSV records, numbered by their first line.
+
+    Quoted fields may contain line breaks: a record is only complete once all
+    of its quotes are closed. The lines must keep their ends, for those line
+    breaks to be kept as they were. Raises ``RecordTooLong`` on records longer
+    than ``max_length`` characters.
+    """
+    record_lines: list[str] = []
+    record_length = quotes = start = 0
+    async for number, line in lines:
+        if not record_lines:
+            start = number
+        record_lines.append(line)
+        # The line breaks inside the record count, the one ending it doesn't
+        if (
+            max_length is not None
+            and record_length + len(line.rstrip("\r\n")) > max_length
+        ):
+            raise RecordTooLong(start, max_length)
+        record_length += len(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+
+        record = "".join(record_lines)
+        record_lines = []
+        record_length = quotes = 0
+        if record.rstrip("\r\n"):
+            yield start, next(csv.reader([record]))
+
+    if record_lines:
+        # An unterminated quote, let the csv module make what it can of it
+        yield start, next(csv.reader(["".join(record_lines)]))
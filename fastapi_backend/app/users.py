@@ -1,14 +1,23 @@
+import hashlib
+import math
+import time
 import uuid
 import re
 
-from typing import Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
 
-from fastapi import Depends, Request
+import jwt
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_users import (
     BaseUserManager,
     FastAPIUsers,
     UUIDIDMixin,
     InvalidPasswordException,
+    exceptions,
 )
 
 from fastapi_users.authentication import (
@@ -16,12 +25,28 @@ from fastapi_users.authentication import (
     BearerTransport,
     JWTStrategy,
 )
+from fastapi_users.authentication.strategy import StrategyDestroyNotSupportedError
 from fastapi_users.db import SQLAlchemyUserDatabase
+from fastapi_users.jwt import decode_jwt, generate_jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from .config import settings
-from .database import get_user_db
+from .database import (
+    get_async_session,
+    get_read_async_session,
+    get_read_user_db,
+    get_user_db,
+    has_recent_write,
+    mark_recent_write,
+    user_changed,
+)
 from .email import send_reset_password_email
-from .models import User
+from .jwks import SigningKeys, load_signing_keys
+from .models import User, UserItemStats
+from .passwords import hash_password, password_helper, verify_and_update_password
+from .revocation import RevocationList, revocation_list, token_expiry
+from .purge import schedule_user_purge
 from .schemas import UserCreate
 
 AUTH_URL_PATH = "auth"
@@ -33,6 +58,27 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
 
     async def on_after_register(self, user: User, request: Optional[Request] = None):
         print(f"User {user.id} has registered.")
+        # Their first requests shouldn't find the replicas without them
+        await mark_recent_write(user.id)
+
+    async def on_after_update(
+        self,
+        user: User,
+        update_dict: dict[str, Any],
+        request: Optional[Request] = None,
+    ):
+        await user_changed(self.user_db.session, user.id)
+
+    async def on_after_verify(self, user: User, request: Optional[Request] = None):
+        await user_changed(self.user_db.session, user.id)
+
+    async def on_after_reset_password(
+        self, user: User, request: Optional[Request] = None
+    ):
+        await user_changed(self.user_db.session, user.id)
+
+    async def on_after_delete(self, user: User, request: Optional[Request] = None):
+        await user_changed(self.user_db.session, user.id)
 
     async def on_after_forgot_password(
         self, user: User, token: str, request: Optional[Request] = None
@@ -44,6 +90,42 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     ):
         print(f"Verification requested for user {user.id}. Verification token: {token}")
 
+    async def delete(self, user: User, request: Optional[Request] = None) -> None:
+        """Delete ``user``, purging them in the background if they have too
+        many items to delete within the request.
+
+        The user is deactivated before the purge starts, which keeps their
+        items from changing while they are deleted. Read endpoints still accept
+        their tokens while their claims are trusted, for up to
+        ACCESS_TOKEN_CLAIMS_SECONDS after they were issued. ``on_after_delete``
+        is called once the purge is done.
+        """
+        threshold = settings.USERS_BACKGROUND_PURGE_THRESHOLD
+        session = self.user_db.session
+        if threshold is not None:
+            item_count = await session.scalar(
+                select(UserItemStats.item_count).where(UserItemStats.user_id == user.id)
+            )
+            if item_count is not None and item_count >= threshold:
+                await self.on_before_delete(user, request)
+                await self.user_db.update(user, {"is_active": False})
+                await user_changed(session, user.id)
+                session_maker = async_sessionmaker(session.bind, expire_on_commit=False)
+
+                async def on_purged() -> None:
+                    # The request's session is closed by now
+                    async with session_maker() as purge_session:
+                        user_manager = UserManager(
+                            SQLAlchemyUserDatabase(purge_session, User),
+                            self.password_helper,
+                        )
+                        await user_manager.on_after_delete(user, request)
+
+                schedule_user_purge(session_maker, user.id, on_purged)
+                return
+
+        await super().delete(user, request)
+
     async def validate_password(
         self,
         password: str,
@@ -63,19 +145,297 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
         if errors:
             raise InvalidPasswordException(reason=errors)
 
+    # The methods below are BaseUserManager's, with passwords hashed and
+    # verified by the password workers rather than on the event loop.
+
+    async def create(
+        self,
+        user_create: UserCreate,
+        safe: bool = False,
+        request: Optional[Request] = None,
+    ) -> User:
+        await self.validate_password(user_create.password, user_create)
+
+        existing_user = await self.user_db.get_by_email(user_create.email)
+        if existing_user is not None:
+            raise exceptions.UserAlreadyExists()
+
+        user_dict = (
+            user_create.create_update_dict()
+            if safe
+            else user_create.create_update_dict_superuser()
+        )
+        user_dict["hashed_password"] = await hash_password(user_dict.pop("password"))
+
+        created_user = await self.user_db.create(user_dict)
+
+        await self.on_after_register(created_user, request)
+
+        return created_user
+
+    async def authenticate(
+        self, credentials: OAuth2PasswordRequestForm
+    ) -> Optional[User]:
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            # Hash anyway, so unknown e-mails take as long as wrong passwords
+            await hash_password(credentials.password)
+            return None
+
+        verified, updated_password_hash = await verify_and_update_password(
+            credentials.password, user.hashed_password
+        )
+        if not verified:
+            return None
+        if updated_password_hash is not None:
+            await self.user_db.update(user, {"hashed_password": updated_password_hash})
+
+        return user
+
+    async def forgot_password(
+        self, user: User, request: Optional[Request] = None
+    ) -> None:
+        if not user.is_active:
+            raise exceptions.UserInactive()
+
+        token_data = {
+            "sub": str(user.id),
+            "password_fgpt": await hash_password(user.hashed_password),
+            "aud": self.reset_password_token_audience,
+        }
+        token = generate_jwt(
+            token_data,
+            self.reset_password_token_secret,
+            self.reset_password_token_lifetime_seconds,
+        )
+        await self.on_after_forgot_password(user, token, request)
+
+    async def reset_password(
+        self, token: str, password: str, request: Optional[Request] = None
+    ) -> User:
+        try:
+            data = decode_jwt(
+                token,
+                self.reset_password_token_secret,
+                [self.reset_password_token_audience],
+            )
+            user_id = data["sub"]
+            password_fingerprint = data["password_fgpt"]
+            parsed_id = self.parse_id(user_id)
+        except (jwt.PyJWTError, KeyError, exceptions.InvalidID):
+            raise exceptions.InvalidResetPasswordToken()
+
+        user = await self.get(parsed_id)
+
+        valid_password_fingerprint, _ = await verify_and_update_password(
+            user.hashed_password, password_fingerprint
+        )
+        if not valid_password_fingerprint:
+            raise exceptions.InvalidResetPasswordToken()
+
+        if not user.is_active:
+            raise exceptions.UserInactive()
+
+        updated_user = await self._update(user, {"password": password})
+
+        await self.on_after_reset_password(user, request)
+
+        return updated_user
+
+    async def _update(self, user: User, update_dict: dict[str, Any]) -> User:
+        password = update_dict.get("password")
+        if password is not None:
+            await self.validate_password(password, user)
+            update_dict = {
+                field: value
+                for field, value in update_dict.items()
+                if field != "password"
+            }
+            update_dict["hashed_password"] = await hash_password(password)
+        return await super()._update(user, update_dict)
+
 
 async def get_user_manager(user_db: SQLAlchemyUserDatabase = Depends(get_user_db)):
-    yield UserManager(user_db)
+    yield UserManager(user_db, password_helper)
+
+
+async def get_read_user_manager(
+    user_db: SQLAlchemyUserDatabase = Depends(get_read_user_db),
+):
+    yield UserManager(user_db, password_helper)
 
 
 bearer_transport = BearerTransport(tokenUrl=f"{AUTH_URL_PATH}/jwt/login")
 
 
-def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(
-        secret=settings.ACCESS_SECRET_KEY,
-        lifetime_seconds=settings.ACCESS_TOKEN_EXPIRE_SECONDS,
-    )
+@dataclass(frozen=True)
+class UserClaims:
+    """What an access token says about its user, as of when it was issued."""
+
+    id: uuid.UUID
+    is_active: bool
+
+
+class ClaimsJWTStrategy(JWTStrategy[User, uuid.UUID]):
+    """JWT strategy whose tokens carry the claims read paths need.
+
+    Tokens are still read with a user lookup by ``read_token``, while
+    ``read_claims`` trusts a token's claims for ``claims_lifetime_seconds``
+    after it was issued.
+
+    Verified payloads are kept in an LRU of ``cache_size`` tokens, by digest,
+    until the token expires: clients send the same token with every request,
+    which then skip verifying and parsing it.
+
+    With ``signing_keys``, tokens are signed with their private key and carry
+    its key id, which picks the public key they are verified with.
+
+    Tokens carry a ``jti`` claim, which ``destroy_token`` adds to
+    ``revocations``. Revocations are checked on every read, cached or not.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        claims_lifetime_seconds: int,
+        cache_size: int,
+        signing_keys: Optional[SigningKeys] = None,
+        revocations: Optional[RevocationList] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.claims_lifetime_seconds = claims_lifetime_seconds
+        self.signing_keys = signing_keys
+        self.revocations = revocations
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._payloads: OrderedDict[bytes, tuple[dict[str, Any], float]] = OrderedDict()
+
+    async def read_token(
+        self, token: Optional[str], user_manager: BaseUserManager[User, uuid.UUID]
+    ) -> Optional[User]:
+        if token is None:
+            return None
+        data = await self.read_payload(token)
+        if data is None:
+            return None
+        try:
+            return await user_manager.get(user_manager.parse_id(data["sub"]))
+        except (KeyError, exceptions.UserNotExists, exceptions.InvalidID):
+            return None
+
+    async def write_token(self, user: User) -> str:
+        data = {
+            "sub": str(user.id),
+            "aud": self.token_audience,
+            "iat": int(time.time()),
+            "jti": uuid.uuid4().hex,
+            "active": user.is_active,
+        }
+        if self.signing_keys is None:
+            return generate_jwt(
+                data, self.encode_key, self.lifetime_seconds, algorithm=self.algorithm
+            )
+
+        if self.lifetime_seconds:
+            data["exp"] = datetime.now(timezone.utc) + timedelta(
+                seconds=self.lifetime_seconds
+            )
+        return jwt.encode(
+            data,
+            self.signing_keys.private_key,
+            algorithm=self.algorithm,
+            headers={"kid": self.signing_keys.key_id},
+        )
+
+    def decode(self, token: str) -> Optional[dict[str, Any]]:
+        """Return the verified payload of ``token``, None if it's invalid."""
+        digest = hashlib.sha256(token.encode()).digest()
+        entry = self._payloads.get(digest)
+        if entry is not None:
+            data, expires_at = entry
+            if expires_at > time.time():
+                self._payloads.move_to_end(digest)
+                self.hits += 1
+                return data
+            del self._payloads[digest]
+        self.misses += 1
+
+        try:
+            key = self.decode_key
+            if self.signing_keys is not None:
+                key_id = jwt.get_unverified_header(token).get("kid")
+                key = self.signing_keys.public_keys[key_id]
+            data = decode_jwt(
+                token, key, self.token_audience, algorithms=[self.algorithm]
+            )
+        except (jwt.PyJWTError, KeyError):
+            return None
+        if self.cache_size > 0:
+            self._payloads[digest] = (data, data.get("exp", math.inf))
+            while len(self._payloads) > self.cache_size:
+                self._payloads.popitem(last=False)
+        return data
+
+    async def destroy_token(self, token: str, user: User) -> None:
+        data = self.decode(token)
+        if self.revocations is None or data is None or "jti" not in data:
+            raise StrategyDestroyNotSupportedError()
+        await self.revocations.revoke(data["jti"], token_expiry(data))
+
+    async def read_payload(self, token: str) -> Optional[dict[str, Any]]:
+        """Return the verified payload of ``token``, None if it's invalid or
+        revoked."""
+        data = self.decode(token)
+        if data is None:
+            return None
+        jti = data.get("jti")
+        if (
+            self.revocations is not None
+            and jti is not None
+            and await self.revocations.is_revoked(jti)
+        ):
+            return None
+        return data
+
+    async def read_claims(self, token: str) -> Optional[UserClaims]:
+        """Return the claims of ``token``, None if they can't be trusted as is."""
+        data = await self.read_payload(token)
+        if data is None:
+            return None
+        try:
+            user_id = uuid.UUID(data["sub"])
+            issued_at = data["iat"]
+            is_active = data["active"]
+        except (KeyError, ValueError):
+            return None
+        if issued_at + self.claims_lifetime_seconds <= time.time():
+            return None
+        return UserClaims(id=user_id, is_active=is_active)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._payloads),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+jwt_strategy = ClaimsJWTStrategy(
+    secret=settings.ACCESS_SECRET_KEY,
+    lifetime_seconds=settings.ACCESS_TOKEN_EXPIRE_SECONDS,
+    claims_lifetime_seconds=settings.ACCESS_TOKEN_CLAIMS_SECONDS,
+    cache_size=settings.ACCESS_TOKEN_CACHE_SIZE,
+    algorithm=settings.ALGORITHM,
+    signing_keys=load_signing_keys(),
+    revocations=revocation_list,
+)
+
+
+def get_jwt_strategy() -> ClaimsJWTStrategy:
+    return jwt_strategy
 
 
 auth_backend = AuthenticationBackend(
@@ -86,4 +446,50 @@ auth_backend = AuthenticationBackend(
 
 fastapi_users = FastAPIUsers[User, uuid.UUID](get_user_manager, [auth_backend])
 
-current_active_user = fastapi_users.current_user(active=True)
+# Authenticated user lookups only read, so they are served by the read replicas
+read_fastapi_users = FastAPIUsers[User, uuid.UUID](
+    get_read_user_manager, [auth_backend]
+)
+
+current_active_user = read_fastapi_users.current_user(active=True)
+
+current_superuser = read_fastapi_users.current_user(active=True, superuser=True)
+
+# Refreshing a token re-checks the user against the primary
+current_active_user_for_refresh = fastapi_users.current_user(active=True)
+
+
+async def current_active_claims(
+    token: Optional[str] = Depends(bearer_transport.scheme),
+    user_manager: UserManager = Depends(get_read_user_manager),
+) -> UserClaims:
+    """Authenticate the request from its token's claims, without a user lookup.
+
+    Tokens too old for their claims to be trusted are checked against the
+    database instead, like ``current_active_user`` does.
+    """
+    if token is not None:
+        strategy = get_jwt_strategy()
+        claims = await strategy.read_claims(token)
+        if claims is None:
+            user = await strategy.read_token(token, user_manager)
+            if user is not None:
+                claims = UserClaims(id=user.id, is_active=user.is_active)
+        if claims is not None and claims.is_active:
+            return claims
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+
+async def get_user_read_session(
+    user: UserClaims = Depends(current_active_claims),
+    session: AsyncSession = Depends(get_async_session),
+    read_session: AsyncSession = Depends(get_read_async_session),
+) -> AsyncSession:
+    """Return the session the current user's reads should go through.
+
+    Users that wrote recently read from the primary so they see their own
+    writes, everyone else reads from the replicas.
+    """
+    if read_session is session:
+        return session
+    return session if await has_recent_write(user.id) else read_session
@@ -0,0 +1,99 @@
+"""
+Compare the database round trips of the item create paths.
+
+Runs against the database in ``DATABASE_URL``, which must be migrated. A
+throwaway user is created for the run and removed afterwards, with its items.
+
+    python -m commands.benchmark_item_writes --requests 200
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from sqlalchemy import delete, event
+
+from app.database import async_session_maker, engine
+from app.models import Item, User
+from app.routes.items import create_item
+from app.schemas import ItemCreate, ItemRead
+
+
+async def create_item_with_refresh(item, db, user):
+    """The create path before INSERT ... RETURNING: commit, then refresh."""
+    db_item = Item(**item.model_dump(), user_id=user.id)
+    db.add(db_item)
+    await db.commit()
+    await db.refresh(db_item)
+    return ItemRead.model_validate(db_item)
+
+
+CREATE_PATHS = {
+    "commit + refresh": create_item_with_refresh,
+    "insert returning": create_item,
+}
+
+
+class RoundTripCounter:
+    """Count the BEGIN, statement and COMMIT round trips sent to the database."""
+
+    def __init__(self, sync_engine):
+        self.sync_engine = sync_engine
+        self.count = 0
+
+    def _increment(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        for name in ("begin", "before_cursor_execute", "commit"):
+            event.listen(self.sync_engine, name, self._increment)
+        return self
+
+    def __exit__(self, *exc_info):
+        for name in ("begin", "before_cursor_execute", "commit"):
+            event.remove(self.sync_engine, name, self._increment)
+
+
+async def benchmark(requests: int) -> None:
+    user_id = uuid4()
+    async with async_session_maker() as db:
+        db.add(
+            User(
+                id=user_id,
+                email=f"benchmark-{user_id}@example.com",
+                hashed_password="x",
+            )
+        )
+        await db.commit()
+    # Authentication costs the same on both paths, so it is left out
+    user = User(id=user_id)
+
+    try:
+        for name, create in CREATE_PATHS.items():
+            with RoundTripCounter(engine.sync_engine) as counter:
+                start = time.perf_counter()
+                for i in range(requests):
+                    # A session per request, as the route dependency does
+                    async with async_session_maker() as db:
+                        await create(
+                            item=ItemCreate(name=f"Item {i}"), db=db, user=user
+                        )
+                elapsed = time.perf_counter() - start
+
+            print(
+                f"{name:>18}: {counter.count / requests:.1f} round trips/request, "
+                f"{elapsed / requests * 1000:.2f} ms/request"
+            )
+    finally:
+        async with async_session_maker() as db:
+            await db.execute(delete(Item).where(Item.user_id == user_id))
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(benchmark(parser.parse_args().requests))
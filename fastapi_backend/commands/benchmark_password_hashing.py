@@ -0,0 +1,122 @@
+"""
+Measure GET /items latency while logins hash passwords, on and off the loop.
+
+Runs the app in process against the database in ``DATABASE_URL``, which must
+be migrated. A throwaway user is created for the run and removed afterwards.
+Login attempts are not rate limited during the run.
+
+    python -m commands.benchmark_password_hashing --logins 50 --workers 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
+
+from app import passwords, rate_limit
+from app.database import async_session_maker, engine
+from app.main import app
+from app.models import User
+from app.users import get_jwt_strategy
+
+PASSWORD = "BenchmarkPassword123#"
+
+
+async def measure(client: AsyncClient, email: str, token: str, logins: int):
+    """Return GET /items latencies and event loop lags during a login storm."""
+    read_latencies: list[float] = []
+    loop_lags: list[float] = []
+    storm_done = asyncio.Event()
+
+    async def login():
+        response = await client.post(
+            "/auth/jwt/login", data={"username": email, "password": PASSWORD}
+        )
+        response.raise_for_status()
+
+    async def read_items():
+        while not storm_done.is_set():
+            start = time.perf_counter()
+            response = await client.get(
+                "/items/", headers={"Authorization": f"Bearer {token}"}
+            )
+            response.raise_for_status()
+            read_latencies.append(time.perf_counter() - start)
+
+    async def probe_loop():
+        while not storm_done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            loop_lags.append(time.perf_counter() - start - 0.001)
+
+    async def storm():
+        await asyncio.gather(*(login() for _ in range(logins)))
+        storm_done.set()
+
+    await asyncio.gather(storm(), read_items(), probe_loop())
+    return read_latencies, loop_lags
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return sorted(values)[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def benchmark(logins: int, workers: int) -> None:
+    user_id = uuid4()
+    email = f"benchmark-{user_id}@example.com"
+    async with async_session_maker() as db:
+        db.add(
+            User(
+                id=user_id,
+                email=email,
+                hashed_password=passwords.password_helper.hash(PASSWORD),
+            )
+        )
+        await db.commit()
+    token = await get_jwt_strategy().write_token(User(id=user_id, is_active=True))
+
+    executors = {
+        "event loop": None,
+        f"{workers} workers": ThreadPoolExecutor(max_workers=workers),
+    }
+    original_executor = passwords.password_executor
+    original_rate_limiter = rate_limit.auth_rate_limiter
+    # The storm logs in as one user from one client, far past the limits
+    rate_limit.auth_rate_limiter = None
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://benchmark"
+        ) as client:
+            for name, executor in executors.items():
+                passwords.password_executor = executor
+                read_latencies, loop_lags = await measure(client, email, token, logins)
+                print(
+                    f"{name:>12}: GET /items p50 "
+                    f"{statistics.median(read_latencies) * 1000:.1f} ms, "
+                    f"p99 {percentile(read_latencies, 0.99) * 1000:.1f} ms, "
+                    f"{len(read_latencies)} reads; "
+                    f"max loop lag {max(loop_lags) * 1000:.1f} ms"
+                )
+    finally:
+        passwords.password_executor = original_executor
+        rate_limit.auth_rate_limiter = original_rate_limiter
+        for executor in executors.values():
+            if executor is not None:
+                executor.shutdown()
+        async with async_session_maker() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.logins, args.workers))
@@ -0,0 +1,52 @@
+"""
+Repair drift between the user_item_stats table and the items it aggregates.
+
+Each user is recounted in its own short transaction, so this can run while
+the app is serving writes.
+
+    python -m commands.reconcile_item_stats
+"""
+
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.counts import reconcile_item_stats
+from app.database import async_session_maker, engine
+from app.models import User
+
+BATCH_SIZE = 1000
+
+
+async def reconcile(session_maker: async_sessionmaker[AsyncSession]) -> int:
+    """Reconcile the item stats of every user, returning how many had drifted."""
+    drifted = 0
+    last_user_id = None
+    while True:
+        async with session_maker() as db:
+            query = select(User.id).order_by(User.id).limit(BATCH_SIZE)
+            if last_user_id is not None:
+                query = query.where(User.id > last_user_id)
+            user_ids = (await db.scalars(query)).all()
+
+        for user_id in user_ids:
+            async with session_maker() as db:
+                drifted += await reconcile_item_stats(db, user_id)
+                await db.commit()
+
+        if len(user_ids) < BATCH_SIZE:
+            return drifted
+        last_user_id = user_ids[-1]
+
+
+async def main() -> None:
+    try:
+        drifted = await reconcile(async_session_maker)
+        print(f"Reconciled item stats, {drifted} user(s) had drifted")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
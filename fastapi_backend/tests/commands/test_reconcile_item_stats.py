@@ -0,0 +1,64 @@
+import uuid
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models import Item, User, UserItemStats
+from commands.reconcile_item_stats import reconcile
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_reconcile(engine, db_session, mocker):
+    mocker.patch("commands.reconcile_item_stats.BATCH_SIZE", 2)
+    user_ids = [uuid.uuid4() for _ in range(3)]
+    await db_session.execute(
+        insert(User).values(
+            [
+                {
+                    "id": user_id,
+                    "email": f"{user_id}@example.com",
+                    "hashed_password": "x",
+                }
+                for user_id in user_ids
+            ]
+        )
+    )
+    await db_session.execute(
+        insert(Item).values(
+            [
+                {"name": "A", "quantity": 2, "user_id": user_ids[0]},
+                {"name": "B", "quantity": None, "user_id": user_ids[0]},
+                {"name": "C", "quantity": 4, "user_id": user_ids[1]},
+            ]
+        )
+    )
+    # Stats of the second user are right, the third user's have drifted
+    await db_session.execute(
+        insert(UserItemStats).values(
+            [
+                {"user_id": user_ids[1], "item_count": 1, "total_quantity": 4},
+                {"user_id": user_ids[2], "item_count": 5, "total_quantity": 9},
+            ]
+        )
+    )
+    await db_session.commit()
+
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    assert await reconcile(session_maker) == 2
+    assert await reconcile(session_maker) == 0
+
+    stats = (
+        await db_session.execute(
+            select(
+                UserItemStats.user_id,
+                UserItemStats.item_count,
+                UserItemStats.total_quantity,
+            )
+        )
+    ).all()
+    assert sorted(stats, key=lambda row: user_ids.index(row.user_id)) == [
+        (user_ids[0], 2, 2),
+        (user_ids[1], 1, 4),
+        (user_ids[2], 0, 0),
+    ]
@@ -101,3 +101,27 @@ async def authenticated_user(test_client, db_session):
         "user": user,
         "user_data": {"email": user_data["email"], "password": "TestPassword123#"},
     }
+
+
+@pytest_asyncio.fixture(scope="function")
+async def authenticated_superuser(test_client, db_session):
+    """Fixture to create and authenticate a superuser directly in the database."""
+    user = User(
+        id=uuid.uuid4(),
+        email="admin@example.com",
+        hashed_password=PasswordHelper().hash("AdminPassword123#"),
+        is_active=True,
+        is_superuser=True,
+        is_verified=True,
+    )
+    db_session.add(user)
+    await db_session.commit()
+    await db_session.refresh(user)
+
+    strategy = get_jwt_strategy()
+    access_token = await strategy.write_token(user)
+
+    return {
+        "headers": {"Authorization": f"Bearer {access_token}"},
+        "user": user,
+    }
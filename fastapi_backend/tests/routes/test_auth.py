@@ -0,0 +1,178 @@
+import pytest
+from fastapi import status
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import users
+from app.rate_limit import AuthRateLimiter, InMemoryRateLimitBackend, RateLimit
+from app.revocation import RevocationList
+
+
+class TestAuth:
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_register_and_login(self, test_client):
+        """Test registering a user, then logging in with their password."""
+        credentials = {"email": "new@example.com", "password": "NewPassword123#"}
+        response = await test_client.post("/auth/register", json=credentials)
+        assert response.status_code == status.HTTP_201_CREATED
+
+        response = await test_client.post(
+            "/auth/jwt/login",
+            data={"username": credentials["email"], "password": "Wrong123#"},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = await test_client.post(
+            "/auth/jwt/login",
+            data={
+                "username": credentials["email"],
+                "password": credentials["password"],
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["token_type"] == "bearer"
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_login_unknown_email(self, test_client):
+        """Test logging in with an e-mail that has no user."""
+        response = await test_client.post(
+            "/auth/jwt/login",
+            data={"username": "nobody@example.com", "password": "Password123#"},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_reset_password(self, test_client, authenticated_user, mocker):
+        """Test resetting a password with the token sent by e-mail."""
+        send_email = mocker.patch("app.users.send_reset_password_email")
+        email = authenticated_user["user_data"]["email"]
+
+        response = await test_client.post(
+            "/auth/forgot-password", json={"email": email}
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        token = send_email.call_args.args[1]
+
+        response = await test_client.post(
+            "/auth/reset-password",
+            json={"token": token, "password": "ResetPassword123#"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        # The token is only valid for the password it was issued for
+        response = await test_client.post(
+            "/auth/reset-password",
+            json={"token": token, "password": "OtherPassword123#"},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = await test_client.post(
+            "/auth/jwt/login",
+            data={"username": email, "password": "ResetPassword123#"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_login_rate_limited(self, test_client, authenticated_user, mocker):
+        """Test login attempts past the limit are rejected before hashing."""
+        mocker.patch(
+            "app.rate_limit.auth_rate_limiter",
+            AuthRateLimiter(
+                InMemoryRateLimitBackend(max_keys=10),
+                ip_limit=RateLimit(burst=10, per_minute=60),
+                email_limit=RateLimit(burst=2, per_minute=6),
+            ),
+        )
+        verify_password = mocker.spy(users, "verify_and_update_password")
+        email = authenticated_user["user_data"]["email"]
+
+        for _ in range(2):
+            response = await test_client.post(
+                "/auth/jwt/login", data={"username": email, "password": "Wrong123#"}
+            )
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = await test_client.post(
+            "/auth/jwt/login",
+            data={"username": email.upper(), "password": "Wrong123#"},
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response.headers["Retry-After"] == "10"
+        assert verify_password.call_count == 2
+
+        # Other e-mails are still let through
+        response = await test_client.post(
+            "/auth/jwt/login",
+            data={"username": "other@example.com", "password": "Wrong123#"},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_register_rate_limited(self, test_client, mocker):
+        """Test registrations past the limit of a client IP are rejected."""
+        mocker.patch(
+            "app.rate_limit.auth_rate_limiter",
+            AuthRateLimiter(
+                InMemoryRateLimitBackend(max_keys=10),
+                ip_limit=RateLimit(burst=1, per_minute=1),
+                email_limit=RateLimit(burst=10, per_minute=60),
+            ),
+        )
+        create_user = mocker.spy(users.UserManager, "create")
+
+        response = await test_client.post(
+            "/auth/register",
+            json={"email": "first@example.com", "password": "Password123#"},
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        response = await test_client.post(
+            "/auth/register",
+            json={"email": "second@example.com", "password": "Password123#"},
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response.headers["Retry-After"] == "60"
+        assert create_user.call_count == 1
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_logout_not_rate_limited(
+        self, test_client, engine, authenticated_user, mocker
+    ):
+        """Test logouts are not counted as authentication attempts."""
+        mocker.patch(
+            "app.users.jwt_strategy.revocations",
+            RevocationList(async_sessionmaker(engine), capacity=100),
+        )
+        limiter = AuthRateLimiter(
+            InMemoryRateLimitBackend(max_keys=10),
+            ip_limit=RateLimit(burst=1, per_minute=1),
+            email_limit=RateLimit(burst=1, per_minute=1),
+        )
+        mocker.patch("app.rate_limit.auth_rate_limiter", limiter)
+
+        response = await test_client.post(
+            "/auth/jwt/logout", headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert limiter.stats()["allowed"] == 0
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_logout(self, test_client, engine, authenticated_user, mocker):
+        """Test a token is rejected everywhere once its user logs out."""
+        mocker.patch(
+            "app.users.jwt_strategy.revocations",
+            RevocationList(async_sessionmaker(engine), capacity=100),
+        )
+        headers = authenticated_user["headers"]
+        response = await test_client.get("/items/", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await test_client.post("/auth/jwt/logout", headers=headers)
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        response = await test_client.get("/items/", headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        response = await test_client.post(
+            "/items/", json={"name": "Item"}, headers=headers
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        response = await test_client.post("/auth/jwt/refresh", headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
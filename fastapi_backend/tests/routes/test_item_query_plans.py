@@ -0,0 +1,234 @@
+import json
+
+import pytest
+from fastapi import status
+from sqlalchemy import event, text
+
+# Enough rows, spread over enough users, that the planner only picks an index
+# when one can actually serve the query.
+SEED_USERS = 200
+SEED_ITEMS_PER_USER = 100
+
+
+def find_seq_scans(plan, table):
+    """Return the sequential scan nodes on ``table`` in an EXPLAIN plan tree."""
+    scans = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == table:
+        scans.append(plan)
+    for subplan in plan.get("Plans", []):
+        scans.extend(find_seq_scans(subplan, table))
+    return scans
+
+
+def find_sorts(plan):
+    """Return the sort nodes, incremental ones included, in a plan tree."""
+    sorts = []
+    if plan.get("Node Type") in ("Sort", "Incremental Sort"):
+        sorts.append(plan)
+    for subplan in plan.get("Plans", []):
+        sorts.extend(find_sorts(subplan))
+    return sorts
+
+
+def find_index_conds(plan, index):
+    """Return the index conditions of the scans of ``index`` in a plan tree."""
+    conds = []
+    if plan.get("Index Name") == index and "Index Cond" in plan:
+        conds.append(plan["Index Cond"])
+    for subplan in plan.get("Plans", []):
+        conds.extend(find_index_conds(subplan, index))
+    return conds
+
+
+@pytest.fixture
+async def seeded_items(db_session, authenticated_user):
+    """Seed other users' items around the authenticated user's items."""
+    await db_session.execute(
+        text(
+            """
+            INSERT INTO "user" (id, email, hashed_password, is_active,
+                                is_superuser, is_verified)
+            SELECT gen_random_uuid(), 'seed' || n || '@example.com', 'x',
+                   true, false, true
+            FROM generate_series(1, :users) AS n
+            """
+        ),
+        {"users": SEED_USERS - 1},
+    )
+    await db_session.execute(
+        text(
+            """
+            INSERT INTO items (id, name, description, quantity, user_id)
+            SELECT gen_random_uuid(), 'Item ' || n, 'Description ' || n, n, u.id
+            FROM "user" AS u, generate_series(1, :items) AS n
+            """
+        ),
+        {"items": SEED_ITEMS_PER_USER},
+    )
+    await db_session.commit()
+    await db_session.execute(text('ANALYZE "user", items'))
+
+
+@pytest.fixture
+def captured_statements(engine):
+    """Capture the SQL statements sent to the test database."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+
+class TestItemQueryPlans:
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_item_queries_use_indexes(
+        self,
+        test_client,
+        engine,
+        authenticated_user,
+        seeded_items,
+        captured_statements,
+    ):
+        """Test no query issued by the items routes scans the whole table."""
+        headers = authenticated_user["headers"]
+
+        response = await test_client.get("/items/", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        page_items = response.json()["items"]
+        item_id = page_items[0]["id"]
+
+        response = await test_client.get(
+            "/items/", params={"fields": "name,quantity"}, headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await test_client.get(
+            "/items/cursor", params={"include_total": True}, headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        response = await test_client.get(
+            "/items/cursor",
+            params={"cursor": response.json()["next_cursor"]},
+            headers=headers,
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await test_client.get(
+            "/items/search", params={"q": "Item 5"}, headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        response = await test_client.get(
+            "/items/search",
+            params={"q": "Item 5", "cursor": response.json()["next_cursor"]},
+            headers=headers,
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await test_client.get("/items/stats", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await test_client.get("/items/export", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await test_client.delete(f"/items/{item_id}", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await test_client.post(
+            "/items/bulk-delete",
+            json={"ids": [item["id"] for item in page_items[1:3]]},
+            headers=headers,
+        )
+        assert response.status_code == status.HTTP_200_OK
+        response = await test_client.post(
+            "/items/bulk-delete", json={"name": "Item 50"}, headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        item_statements = [
+            (statement, parameters)
+            for statement, parameters in captured_statements
+            if "items" in statement
+            and statement.lstrip().startswith(("SELECT", "DELETE", "UPDATE", "WITH"))
+        ]
+        assert item_statements
+
+        seq_scans = []
+        async with engine.connect() as conn:
+            for statement, parameters in item_statements:
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {statement}", parameters
+                )
+                plan = result.scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                if find_seq_scans(plan[0]["Plan"], "items"):
+                    seq_scans.append(statement)
+
+        assert seq_scans == []
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_user_listing_uses_indexes(
+        self,
+        test_client,
+        engine,
+        authenticated_superuser,
+        seeded_items,
+        captured_statements,
+    ):
+        """Test listing users neither scans the user table nor all items."""
+        headers = authenticated_superuser["headers"]
+
+        response = await test_client.get(
+            "/users/",
+            params={"email_prefix": "seed1", "include_item_count": True},
+            headers=headers,
+        )
+        assert response.status_code == status.HTTP_200_OK
+        response = await test_client.get(
+            "/users/",
+            params={"cursor": response.json()["next_cursor"], "is_active": True},
+            headers=headers,
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        listing_statements = [
+            (statement, parameters)
+            for statement, parameters in captured_statements
+            if 'ORDER BY lower("user".email)' in statement
+            or "user_item_stats" in statement
+        ]
+        assert len(listing_statements) == 3
+
+        seq_scans = []
+        sorts = []
+        prefix_conds = []
+        async with engine.connect() as conn:
+            # A few hundred users fit in a couple of pages, which are cheaper to
+            # scan than any index: check that an index can serve the listing
+            await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            for statement, parameters in listing_statements:
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {statement}", parameters
+                )
+                plan = result.scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                if find_seq_scans(plan[0]["Plan"], "user"):
+                    seq_scans.append(statement)
+                if find_sorts(plan[0]["Plan"]):
+                    sorts.append(statement)
+                if "LIKE" in statement:
+                    prefix_conds = find_index_conds(
+                        plan[0]["Plan"], "ix_user_email_lower"
+                    )
+
+        assert seq_scans == []
+        # The index that serves the prefix also returns the users in order
+        assert sorts == []
+        # The prefix is a range of the index, not a filter of a full index scan
+        assert len(prefix_conds) == 1
+        assert ">= 'seed1'" in prefix_conds[0]
+        assert "< 'seed2'" in prefix_conds[0]
@@ -1,7 +1,15 @@
+import csv
+import io
+import json
+import uuid
+
 import pytest
 from fastapi import status
-from sqlalchemy import select, insert
-from app.models import Item
+from sqlalchemy import event, select, insert, text, update
+from app.cache import InMemoryCache, ItemPageCache
+from app.models import Item, User
+from app.pagination import encode_cursor
+from app.schemas import CountedPage, ItemSparseRead
 
 
 class TestItems:
@@ -28,6 +36,36 @@ class TestItems:
         assert item.name == item_data["name"]
         assert item.description == item_data["description"]
 
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_create_item_single_statement(
+        self, test_client, engine, authenticated_user
+    ):
+        """Test the created item is read back from the INSERT, not re-selected."""
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            response = await test_client.post(
+                "/items/",
+                json={"name": "Test Item", "quantity": 3},
+                headers=authenticated_user["headers"],
+            )
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["quantity"] == 3
+        item_statements = [
+            statement
+            for statement in statements
+            if "INTO items" in statement or "FROM items" in statement
+        ]
+        assert len(item_statements) == 1
+        assert "INSERT INTO items" in item_statements[0]
+
     @pytest.mark.asyncio(loop_scope="function")
     async def test_read_items(self, test_client, db_session, authenticated_user):
         """Test reading items."""
@@ -132,3 +170,962 @@ class TestItems:
             "/items/00000000-0000-0000-0000-000000000000"
         )
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_items_cursor(self, test_client, db_session, authenticated_user):
+        """Test walking the items forwards and backwards with cursors."""
+        for i in range(5):
+            await db_session.execute(
+                insert(Item).values(
+                    name=f"Item {i}", user_id=authenticated_user["user"].id
+                )
+            )
+        await db_session.commit()
+
+        pages = []
+        params = {"size": 2, "include_total": True}
+        while True:
+            response = await test_client.get(
+                "/items/cursor", params=params, headers=authenticated_user["headers"]
+            )
+            assert response.status_code == status.HTTP_200_OK
+            page = response.json()
+            pages.append(page)
+            if page["next_cursor"] is None:
+                break
+            params = {"size": 2, "cursor": page["next_cursor"]}
+
+        assert [len(page["items"]) for page in pages] == [2, 2, 1]
+        assert [page["total"] for page in pages] == [5, None, None]
+        assert pages[0]["previous_cursor"] is None
+        ids = [item["id"] for page in pages for item in page["items"]]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == 5
+
+        # Going back from the last page returns the second page again
+        response = await test_client.get(
+            "/items/cursor",
+            params={"size": 2, "cursor": pages[2]["previous_cursor"]},
+            headers=authenticated_user["headers"],
+        )
+        previous_page = response.json()
+        assert previous_page["items"] == pages[1]["items"]
+        assert previous_page["next_cursor"] is not None
+        assert previous_page["total"] is None
+
+        # And going back once more returns the first page, which has no previous
+        response = await test_client.get(
+            "/items/cursor",
+            params={"size": 2, "cursor": previous_page["previous_cursor"]},
+            headers=authenticated_user["headers"],
+        )
+        first_page = response.json()
+        assert first_page["items"] == pages[0]["items"]
+        assert first_page["previous_cursor"] is None
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_items_invalid_cursor(self, test_client, authenticated_user):
+        """Test reading items with a malformed cursor."""
+        response = await test_client.get(
+            "/items/cursor",
+            params={"cursor": "not-a-cursor"},
+            headers=authenticated_user["headers"],
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_item_stats(
+        self, test_client, db_session, authenticated_user, mocker
+    ):
+        """Test every item write path keeps the user's item stats current."""
+        headers = authenticated_user["headers"]
+        user_id = authenticated_user["user"].id
+
+        async def assert_stats_match_items():
+            response = await test_client.get("/items/stats", headers=headers)
+            assert response.status_code == status.HTTP_200_OK
+            items = (
+                await db_session.scalars(select(Item).where(Item.user_id == user_id))
+            ).all()
+            assert response.json() == {
+                "item_count": len(items),
+                "total_quantity": sum(item.quantity or 0 for item in items),
+            }
+
+        await assert_stats_match_items()
+        response = await test_client.post(
+            "/items/", json={"name": "A", "quantity": 3}, headers=headers
+        )
+        item_id = response.json()["id"]
+        await assert_stats_match_items()
+        await test_client.post(
+            "/items/bulk",
+            json=[{"name": "B", "quantity": 2}, {"name": "C"}],
+            headers=headers,
+        )
+        await assert_stats_match_items()
+        mocker.patch("app.routes.items.settings.ITEMS_BULK_COPY_THRESHOLD", 1)
+        await test_client.post(
+            "/items/bulk", json=[{"name": "D", "quantity": 5}], headers=headers
+        )
+        await assert_stats_match_items()
+        await test_client.post(
+            "/items/import",
+            content=b'{"name": "E", "quantity": 7}\n{"name": "F"}',
+            headers={**headers, "Content-Type": "application/x-ndjson"},
+        )
+        await assert_stats_match_items()
+        await test_client.delete(f"/items/{item_id}", headers=headers)
+        await assert_stats_match_items()
+        await test_client.post(
+            "/items/bulk-delete", json={"name": "E"}, headers=headers
+        )
+        await assert_stats_match_items()
+        await test_client.post(
+            "/items/bulk-delete", json={"name": "X"}, headers=headers
+        )
+        await assert_stats_match_items()
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_search_items(self, test_client, db_session, authenticated_user):
+        """Test searching items ranks name matches first and pages through them."""
+        user_id = authenticated_user["user"].id
+        other_user_id = uuid.uuid4()
+        await db_session.execute(
+            insert(User).values(
+                id=other_user_id, email="other@example.com", hashed_password="x"
+            )
+        )
+        await db_session.execute(
+            insert(Item).values(
+                [
+                    {
+                        "name": "Red chairs",
+                        "description": "Set of 4",
+                        "user_id": user_id,
+                    },
+                    {"name": "Table", "description": "Red paint", "user_id": user_id},
+                    {"name": "Blue chair", "description": None, "user_id": user_id},
+                    {"name": "Armchair", "description": None, "user_id": user_id},
+                    {"name": "Red lamp", "description": None, "user_id": other_user_id},
+                ]
+            )
+        )
+        await db_session.commit()
+        headers = authenticated_user["headers"]
+
+        response = await test_client.get(
+            "/items/search", params={"q": "red"}, headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["name"] for item in response.json()["items"]] == [
+            "Red chairs",
+            "Table",
+        ]
+
+        response = await test_client.get(
+            "/items/search", params={"q": "chair -blue"}, headers=headers
+        )
+        assert [item["name"] for item in response.json()["items"]] == ["Red chairs"]
+
+        names, cursor = [], None
+        while True:
+            params = {"q": "chair", "size": 1}
+            if cursor:
+                params["cursor"] = cursor
+            response = await test_client.get(
+                "/items/search", params=params, headers=headers
+            )
+            assert response.status_code == status.HTTP_200_OK
+            names.extend(item["name"] for item in response.json()["items"])
+            cursor = response.json()["next_cursor"]
+            if cursor is None:
+                break
+
+        # Word matches first, then the substring match
+        assert sorted(names[:2]) == ["Blue chair", "Red chairs"]
+        assert names[2:] == ["Armchair"]
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_search_items_misspelled(
+        self, test_client, db_session, authenticated_user, mocker
+    ):
+        """Test misspelled terms match similar names, where pg_trgm is installed."""
+        await db_session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await db_session.execute(
+            insert(Item).values(
+                [
+                    {"name": "Bookshelf", "user_id": authenticated_user["user"].id},
+                    {"name": "Oak bookcase", "user_id": authenticated_user["user"].id},
+                    {"name": "Lamp", "user_id": authenticated_user["user"].id},
+                ]
+            )
+        )
+        await db_session.commit()
+        mocker.patch("app.routes.items._pg_trgm_installed", None)
+
+        response = await test_client.get(
+            "/items/search",
+            params={"q": "bookshef"},
+            headers=authenticated_user["headers"],
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["name"] for item in response.json()["items"]] == ["Bookshelf"]
+
+        mocker.patch("app.routes.items._pg_trgm_installed", False)
+        response = await test_client.get(
+            "/items/search",
+            params={"q": "bookshef"},
+            headers=authenticated_user["headers"],
+        )
+        assert response.json()["items"] == []
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_search_items_invalid_cursor(self, test_client, authenticated_user):
+        """Test a cursor with a rank that isn't a number is rejected."""
+        cursor = encode_cursor("next", ["abc", uuid.uuid4()])
+
+        response = await test_client.get(
+            "/items/search",
+            params={"q": "chair", "cursor": cursor},
+            headers=authenticated_user["headers"],
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid cursor"
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_search_items_escapes_wildcards(
+        self, test_client, db_session, authenticated_user
+    ):
+        """Test LIKE wildcards in the search terms are matched literally."""
+        await db_session.execute(
+            insert(Item).values(
+                [
+                    {"name": "100% cotton", "user_id": authenticated_user["user"].id},
+                    {"name": "1000 pins", "user_id": authenticated_user["user"].id},
+                ]
+            )
+        )
+        await db_session.commit()
+
+        response = await test_client.get(
+            "/items/search",
+            params={"q": "0%"},
+            headers=authenticated_user["headers"],
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["name"] for item in response.json()["items"]] == ["100% cotton"]
+
+    @pytest.mark.asyncio(loop_scope="function")
+    @pytest.mark.parametrize("count", ["exact", "cached", "estimate"])
+    async def test_read_items_count_strategy(
+        self, test_client, db_session, authenticated_user, count
+    ):
+        """Test the count strategy used for the total is reported."""
+        for i in range(3):
+            await db_session.execute(
+                insert(Item).values(
+                    name=f"Item {i}", user_id=authenticated_user["user"].id
+                )
+            )
+        await db_session.commit()
+
+        response = await test_client.get(
+            "/items/", params={"count": count}, headers=authenticated_user["headers"]
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        response_data = response.json()
+        assert response_data["count_strategy"] == count
+        assert len(response_data["items"]) == 3
+        # Estimates this small are counted
+        assert response_data["total"] == 3
+        assert response_data["pages"] == 1
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_items_estimate_without_items(
+        self, test_client, authenticated_user
+    ):
+        """Test a user without items gets a total of 0, which no estimate is."""
+        response = await test_client.get(
+            "/items/",
+            params={"count": "estimate"},
+            headers=authenticated_user["headers"],
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["total"] == 0
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_items_estimate_above_threshold(
+        self, test_client, authenticated_user, mocker
+    ):
+        """Test estimates from the threshold up are returned as they are."""
+        mocker.patch("app.counts.settings.ITEMS_COUNT_ESTIMATE_THRESHOLD", 1)
+        estimate = mocker.patch("app.counts.estimate_item_count", return_value=5000)
+
+        response = await test_client.get(
+            "/items/",
+            params={"count": "estimate"},
+            headers=authenticated_user["headers"],
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["total"] == 5000
+        assert estimate.called
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_items_fast_serialization(
+        self, test_client, db_session, authenticated_user, mocker
+    ):
+        """Test the fast serialization path returns the same pages."""
+        for i in range(5):
+            await db_session.execute(
+                insert(Item).values(
+                    name=f"Item {i}",
+                    description=None if i % 2 else f"Description {i}",
+                    quantity=i,
+                    user_id=authenticated_user["user"].id,
+                )
+            )
+        await db_session.commit()
+
+        pages = {}
+        for fast in (False, True):
+            mocker.patch("app.routes.items.settings.ITEMS_FAST_SERIALIZATION", fast)
+            response = await test_client.get(
+                "/items/",
+                params={"page": 2, "size": 2},
+                headers=authenticated_user["headers"],
+            )
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["content-type"] == "application/json"
+            pages[fast] = response.json()
+
+        assert pages[True] == pages[False]
+        assert len(pages[True]["items"]) == 2
+        assert pages[True]["pages"] == 3
+
+    @pytest.mark.asyncio(loop_scope="function")
+    @pytest.mark.parametrize("fast", [False, True])
+    async def test_read_items_page_cache(
+        self, test_client, db_session, authenticated_user, mocker, fast
+    ):
+        """Test pages are served from the cache until the user's items change."""
+        page_cache = ItemPageCache(InMemoryCache(max_entries=100), ttl=60)
+        mocker.patch("app.cache.item_page_cache", page_cache)
+        mocker.patch("app.routes.items.settings.ITEMS_FAST_SERIALIZATION", fast)
+        headers = authenticated_user["headers"]
+        await db_session.execute(
+            insert(Item).values(name="Item", user_id=authenticated_user["user"].id)
+        )
+        await db_session.commit()
+
+        first = await test_client.get("/items/", headers=headers)
+        second = await test_client.get("/items/", headers=headers)
+
+        assert first.status_code == second.status_code == status.HTTP_200_OK
+        assert second.json() == first.json()
+        assert first.json()["total"] == 1
+        assert (page_cache.hits, page_cache.misses) == (1, 1)
+
+        response = await test_client.post(
+            "/items/", json={"name": "New"}, headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await test_client.get("/items/", headers=headers)
+        assert response.json()["total"] == 2
+        assert (page_cache.hits, page_cache.misses) == (1, 2)
+
+        # A write through another worker only shows in the database version
+        await db_session.execute(
+            insert(Item).values(name="Other", user_id=authenticated_user["user"].id)
+        )
+        await db_session.execute(
+            update(User)
+            .where(User.id == authenticated_user["user"].id)
+            .values(items_version=User.items_version + 1)
+        )
+        await db_session.commit()
+
+        response = await test_client.get("/items/", headers=headers)
+        assert response.json()["total"] == 3
+        assert (page_cache.hits, page_cache.misses) == (1, 3)
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_items_fields(
+        self, test_client, engine, db_session, authenticated_user
+    ):
+        """Test only the requested fields are selected and returned."""
+        await db_session.execute(
+            insert(Item).values(
+                name="Item",
+                description="A long description",
+                quantity=2,
+                user_id=authenticated_user["user"].id,
+            )
+        )
+        await db_session.commit()
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            response = await test_client.get(
+                "/items/",
+                params={"fields": "name, quantity"},
+                headers=authenticated_user["headers"],
+            )
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["items"] == [
+            {"id": data["items"][0]["id"], "name": "Item", "quantity": 2}
+        ]
+        assert data["total"] == 1
+        # The documented model of sparse pages
+        CountedPage[ItemSparseRead].model_validate(data)
+        page_statements = [s for s in statements if "FROM items" in s and "LIMIT" in s]
+        assert len(page_statements) == 1
+        assert "description" not in page_statements[0]
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_items_unknown_fields(self, test_client, authenticated_user):
+        """Test requesting fields items don't have."""
+        response = await test_client.get(
+            "/items/",
+            params={"fields": "name,hashed_password"},
+            headers=authenticated_user["headers"],
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Unknown fields: hashed_password"
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_items_etag(self, test_client, authenticated_user, mocker):
+        """Test unchanged pages are answered with 304 Not Modified."""
+        headers = authenticated_user["headers"]
+        response = await test_client.get("/items/", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response.headers["etag"]
+        assert etag.startswith('W/"')
+
+        count_items = mocker.patch("app.routes.items.count_items")
+        for if_none_match in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+            response = await test_client.get(
+                "/items/", headers={**headers, "If-None-Match": if_none_match}
+            )
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.headers["etag"] == etag
+            assert response.content == b""
+        count_items.assert_not_called()
+        mocker.stopall()
+
+        response = await test_client.post(
+            "/items/", json={"name": "New"}, headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await test_client.get(
+            "/items/", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+        assert response.json()["total"] == 1
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_item_writes_change_etag(
+        self, test_client, db_session, authenticated_user
+    ):
+        """Test every item write path changes the ETag of the listings."""
+        headers = authenticated_user["headers"]
+
+        async def get_etag():
+            response = await test_client.get("/items/", headers=headers)
+            return response.headers["etag"]
+
+        etags = [await get_etag()]
+        response = await test_client.post(
+            "/items/", json={"name": "A"}, headers=headers
+        )
+        item_id = response.json()["id"]
+        etags.append(await get_etag())
+        await test_client.post("/items/bulk", json=[{"name": "B"}], headers=headers)
+        etags.append(await get_etag())
+        await test_client.post(
+            "/items/import",
+            content=b'{"name": "C"}',
+            headers={**headers, "Content-Type": "application/x-ndjson"},
+        )
+        etags.append(await get_etag())
+        await test_client.post(
+            "/items/bulk-delete", json={"name": "C"}, headers=headers
+        )
+        etags.append(await get_etag())
+        await test_client.delete(f"/items/{item_id}", headers=headers)
+        etags.append(await get_etag())
+
+        assert len(set(etags)) == len(etags)
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_items_cached_count_invalidation(
+        self, test_client, db_session, authenticated_user
+    ):
+        """Test cached totals are dropped when the user's items change."""
+        headers = authenticated_user["headers"]
+        user_id = authenticated_user["user"].id
+        params = {"count": "cached"}
+        await test_client.post("/items/", json={"name": "First"}, headers=headers)
+
+        response = await test_client.get("/items/", params=params, headers=headers)
+        assert response.json()["total"] == 1
+
+        # Rows written without bumping the version aren't seen until the entry
+        # expires
+        await db_session.execute(insert(Item).values(name="Direct", user_id=user_id))
+        await db_session.commit()
+        response = await test_client.get("/items/", params=params, headers=headers)
+        assert response.json()["total"] == 1
+
+        # Writes through the API bump the version, which drops the cached total
+        await test_client.post("/items/", json={"name": "Second"}, headers=headers)
+        response = await test_client.get("/items/", params=params, headers=headers)
+        assert response.json()["total"] == 3
+        etag = response.headers["etag"]
+
+        # As do writes through other workers, which only show in the database
+        await db_session.execute(insert(Item).values(name="Other", user_id=user_id))
+        await db_session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(items_version=User.items_version + 1)
+        )
+        await db_session.commit()
+        response = await test_client.get(
+            "/items/", params=params, headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["total"] == 4
+        assert response.headers["etag"] != etag
+
+    @pytest.mark.asyncio(loop_scope="function")
+    @pytest.mark.parametrize("copy_threshold", [1000, 2])
+    async def test_create_items_bulk(
+        self, test_client, db_session, authenticated_user, mocker, copy_threshold
+    ):
+        """Test creating items in bulk with INSERT ... RETURNING and with COPY."""
+        mocker.patch(
+            "app.routes.items.settings.ITEMS_BULK_COPY_THRESHOLD", copy_threshold
+        )
+        items_data = [
+            {"name": "First Item", "quantity": 1},
+            {"name": "Second Item", "description": "Second Description"},
+            {"name": "Third Item", "quantity": 3},
+        ]
+
+        response = await test_client.post(
+            "/items/bulk", json=items_data, headers=authenticated_user["headers"]
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        created_items = response.json()
+        assert [item["name"] for item in created_items] == [
+            "First Item",
+            "Second Item",
+            "Third Item",
+        ]
+        assert created_items[1]["description"] == "Second Description"
+        assert all(
+            item["user_id"] == str(authenticated_user["user"].id)
+            for item in created_items
+        )
+
+        db_items = (
+            (
+                await db_session.execute(
+                    select(Item).where(
+                        Item.id.in_([item["id"] for item in created_items])
+                    )
+                )
+            )
+            .scalars()
+            .all()
+        )
+        assert len(db_items) == 3
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_create_items_bulk_is_atomic(
+        self, test_client, db_session, authenticated_user
+    ):
+        """Test an invalid item in the batch rejects the whole batch."""
+        items_data = [{"name": "Valid Item"}, {"description": "Missing name"}]
+
+        response = await test_client.post(
+            "/items/bulk", json=items_data, headers=authenticated_user["headers"]
+        )
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        db_items = (await db_session.execute(select(Item))).scalars().all()
+        assert db_items == []
+
+    @pytest.mark.asyncio(loop_scope="function")
+    @pytest.mark.parametrize("batch_size", [0, 1001])
+    async def test_create_items_bulk_batch_size(
+        self, test_client, authenticated_user, batch_size
+    ):
+        """Test empty and oversized batches are rejected."""
+        items_data = [{"name": f"Item {i}"} for i in range(batch_size)]
+
+        response = await test_client.post(
+            "/items/bulk", json=items_data, headers=authenticated_user["headers"]
+        )
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_delete_items_bulk_by_ids(
+        self, test_client, db_session, authenticated_user, authenticated_superuser
+    ):
+        """Test bulk deleting items by id only deletes the user's items."""
+        user_id = authenticated_user["user"].id
+        own_ids = (
+            (
+                await db_session.execute(
+                    insert(Item)
+                    .values(
+                        [{"name": f"Item {i}", "user_id": user_id} for i in range(3)]
+                    )
+                    .returning(Item.id)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        other_id = (
+            await db_session.execute(
+                insert(Item)
+                .values(name="Other", user_id=authenticated_superuser["user"].id)
+                .returning(Item.id)
+            )
+        ).scalar()
+        await db_session.commit()
+
+        requested_ids = [own_ids[0], own_ids[1], other_id, uuid.uuid4()]
+        response = await test_client.post(
+            "/items/bulk-delete",
+            json={"ids": [str(item_id) for item_id in requested_ids]},
+            headers=authenticated_user["headers"],
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(response.json()["deleted_ids"]) == sorted(
+            [str(own_ids[0]), str(own_ids[1])]
+        )
+        remaining_ids = (await db_session.execute(select(Item.id))).scalars().all()
+        assert sorted(remaining_ids) == sorted([own_ids[2], other_id])
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_delete_items_bulk_by_name(
+        self, test_client, db_session, authenticated_user
+    ):
+        """Test bulk deleting items matching a filter."""
+        user_id = authenticated_user["user"].id
+        await db_session.execute(
+            insert(Item).values(
+                [
+                    {"name": "Duplicate", "user_id": user_id},
+                    {"name": "Duplicate", "user_id": user_id},
+                    {"name": "Unique", "user_id": user_id},
+                ]
+            )
+        )
+        await db_session.commit()
+
+        response = await test_client.post(
+            "/items/bulk-delete",
+            json={"name": "Duplicate"},
+            headers=authenticated_user["headers"],
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["deleted_ids"]) == 2
+        remaining_names = (await db_session.execute(select(Item.name))).scalars().all()
+        assert remaining_names == ["Unique"]
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_delete_items_bulk_nothing_matched(
+        self, test_client, db_session, authenticated_user
+    ):
+        """Test a bulk delete matching nothing leaves the ETag unchanged."""
+        headers = authenticated_user["headers"]
+        await test_client.post("/items/", json={"name": "Kept"}, headers=headers)
+        etag = (await test_client.get("/items/", headers=headers)).headers["ETag"]
+
+        response = await test_client.post(
+            "/items/bulk-delete", json={"name": "Missing"}, headers=headers
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["deleted_ids"] == []
+        response = await test_client.get(
+            "/items/", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_delete_items_bulk_requires_filter(
+        self, test_client, authenticated_user
+    ):
+        """Test bulk deleting without any filter is rejected."""
+        response = await test_client.post(
+            "/items/bulk-delete", json={}, headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    @pytest.mark.asyncio(loop_scope="function")
+    @pytest.mark.parametrize("accept_encoding", ["identity", "gzip"])
+    async def test_export_items_ndjson(
+        self, test_client, db_session, authenticated_user, mocker, accept_encoding
+    ):
+        """Test streaming the user's items as NDJSON across several batches."""
+        mocker.patch("app.routes.items.settings.ITEMS_EXPORT_BATCH_SIZE", 2)
+        user_id = authenticated_user["user"].id
+        await db_session.execute(
+            insert(Item).values(
+                [
+                    {"name": f"Item {i}", "quantity": i, "user_id": user_id}
+                    for i in range(5)
+                ]
+            )
+        )
+        await db_session.commit()
+
+        response = await test_client.get(
+            "/items/export",
+            headers={
+                **authenticated_user["headers"],
+                "Accept-Encoding": accept_encoding,
+            },
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        if accept_encoding == "gzip":
+            assert response.headers["content-encoding"] == "gzip"
+        else:
+            assert "content-encoding" not in response.headers
+        # httpx transparently decodes gzip
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(row["quantity"] for row in rows) == [0, 1, 2, 3, 4]
+        assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+        assert all(row["user_id"] == str(user_id) for row in rows)
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_export_items_csv(self, test_client, db_session, authenticated_user):
+        """Test streaming the user's items as CSV."""
+        user_id = authenticated_user["user"].id
+        await db_session.execute(
+            insert(Item).values(
+                [
+                    {"name": "Plain", "description": None, "user_id": user_id},
+                    {"name": "Comma, quoted", "description": "x", "user_id": user_id},
+                ]
+            )
+        )
+        await db_session.commit()
+
+        response = await test_client.get(
+            "/items/export",
+            params={"format": "csv"},
+            headers=authenticated_user["headers"],
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert sorted(row["name"] for row in rows) == ["Comma, quoted", "Plain"]
+        assert {row["description"] for row in rows} == {"", "x"}
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_unauthorized_export_items(self, test_client):
+        """Test exporting items without authentication."""
+        response = await test_client.get("/items/export")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_import_items_ndjson(
+        self, test_client, db_session, authenticated_user, mocker
+    ):
+        """Test importing NDJSON items in batches, reporting the invalid lines."""
+        mocker.patch("app.routes.items.settings.ITEMS_IMPORT_BATCH_SIZE", 2)
+        body = (
+            b'{"name": "First", "quantity": 1}\n'
+            b"\n"
+            b'{"name": "Second", "description": "Caf\xc3\xa9"}\n'
+            b'{"quantity": 3}\n'
+            b"not json\n"
+            b'{"name": "Third"}'
+        )
+
+        async def chunks():
+            # Split lines, and a multi-byte character, across chunks
+            for i in range(0, len(body), 7):
+                yield body[i : i + 7]
+
+        response = await test_client.post(
+            "/items/import",
+            content=chunks(),
+            headers={
+                **authenticated_user["headers"],
+                "Content-Type": "application/x-ndjson",
+            },
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["imported"] == 3
+        assert data["failed"] == 2
+        assert [error["line"] for error in data["errors"]] == [4, 5]
+        assert data["errors"][0]["errors"] == ["name: Field required"]
+
+        items = (
+            await db_session.scalars(
+                select(Item).filter(Item.user_id == authenticated_user["user"].id)
+            )
+        ).all()
+        assert sorted((item.name, item.description) for item in items) == [
+            ("First", None),
+            ("Second", "Café"),
+            ("Third", None),
+        ]
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_import_items_csv(self, test_client, db_session, authenticated_user):
+        """Test importing CSV items, including quoted fields spanning lines."""
+        body = (
+            "name,description,quantity\r\n"
+            "Plain,,1\r\n"
+            '"Comma, quoted","Two\r\nlines",2\r\n'
+            "Bad quantity,,many\r\n"
+            "Short row\r\n"
+        )
+
+        response = await test_client.post(
+            "/items/import",
+            content=body.encode(),
+            headers={**authenticated_user["headers"], "Content-Type": "text/csv"},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["imported"] == 2
+        assert data["failed"] == 2
+        assert [error["line"] for error in data["errors"]] == [5, 6]
+        assert data["errors"][1]["errors"] == ["row: Expected 3 fields, got 1"]
+
+        items = (
+            await db_session.scalars(
+                select(Item).filter(Item.user_id == authenticated_user["user"].id)
+            )
+        ).all()
+        assert sorted(
+            (item.name, item.description, item.quantity) for item in items
+        ) == [
+            ("Comma, quoted", "Two\r\nlines", 2),
+            ("Plain", None, 1),
+        ]
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_import_items_not_utf8(
+        self, test_client, db_session, authenticated_user, mocker
+    ):
+        """Test a body that isn't UTF-8 is rejected, importing nothing."""
+        mocker.patch("app.routes.items.settings.ITEMS_IMPORT_BATCH_SIZE", 1)
+
+        response = await test_client.post(
+            "/items/import",
+            content=b"name\nFirst\ncaf\xe9\n",
+            headers={**authenticated_user["headers"], "Content-Type": "text/csv"},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "The body is not UTF-8 encoded"
+        items = await db_session.scalars(
+            select(Item).filter(Item.user_id == authenticated_user["user"].id)
+        )
+        assert items.all() == []
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_import_items_record_too_long(
+        self, test_client, db_session, authenticated_user, mocker
+    ):
+        """Test a record over the length cap is rejected, importing nothing."""
+        mocker.patch("app.routes.items.settings.ITEMS_IMPORT_BATCH_SIZE", 1)
+        mocker.patch("app.routes.items.settings.ITEMS_IMPORT_MAX_RECORD_LENGTH", 20)
+
+        response = await test_client.post(
+            "/items/import",
+            content=b'name,description\nFirst,\nSecond,"' + b"x" * 100 + b'"\n',
+            headers={**authenticated_user["headers"], "Content-Type": "text/csv"},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Line 3 is longer than 20 characters"
+        items = await db_session.scalars(
+            select(Item).filter(Item.user_id == authenticated_user["user"].id)
+        )
+        assert items.all() == []
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_import_items_csv_byte_order_mark(
+        self, test_client, authenticated_user
+    ):
+        """Test a CSV saved with a byte order mark keeps its first column."""
+        response = await test_client.post(
+            "/items/import",
+            content="\ufeffname,quantity\r\nFirst,1\r\n".encode(),
+            headers={**authenticated_user["headers"], "Content-Type": "text/csv"},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["imported"] == 1
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_import_items_caps_errors(
+        self, test_client, authenticated_user, mocker
+    ):
+        """Test only the first errors are reported, while all are counted."""
+        mocker.patch("app.routes.items.settings.ITEMS_IMPORT_MAX_ERRORS", 2)
+
+        response = await test_client.post(
+            "/items/import",
+            content=b"{}\n{}\n{}\n",
+            headers={
+                **authenticated_user["headers"],
+                "Content-Type": "application/x-ndjson",
+            },
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["failed"] == 3
+        assert len(response.json()["errors"]) == 2
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_import_items_unsupported_media_type(
+        self, test_client, authenticated_user
+    ):
+        """Test importing a body that is neither CSV nor NDJSON."""
+        response = await test_client.post(
+            "/items/import",
+            json=[{"name": "Item"}],
+            headers=authenticated_user["headers"],
+        )
+
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
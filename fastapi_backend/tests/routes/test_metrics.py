@@ -0,0 +1,33 @@
+import pytest
+from fastapi import status
+
+
+class TestMetrics:
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_metrics(self, test_client, authenticated_superuser):
+        """Test reading metrics as a superuser."""
+        response = await test_client.get(
+            "/metrics/", headers=authenticated_superuser["headers"]
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["database_pool"]["mode"] == "null"
+        assert response.json()["items_cache"] is None
+        assert response.json()["users_cache"] is None
+        assert response.json()["auth_rate_limit"]["backend"] == "memory"
+        assert response.json()["access_token_cache"]["hits"] >= 0
+        assert response.json()["token_revocations"]["checks"] >= 0
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_metrics_forbidden(self, test_client, authenticated_user):
+        """Test reading metrics as a regular user."""
+        response = await test_client.get(
+            "/metrics/", headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_unauthorized_read_metrics(self, test_client):
+        """Test reading metrics without authentication."""
+        response = await test_client.get("/metrics/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
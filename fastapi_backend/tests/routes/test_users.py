@@ -0,0 +1,358 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from sqlalchemy import event, func, insert, select, update
+
+from app.models import Item, User, UserItemStats
+from app import purge
+from app.cache import UserCache
+from app.purge import purge_tasks
+from app.users import UserClaims, get_jwt_strategy
+
+
+class TestUsers:
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_delete_user(
+        self,
+        test_client,
+        engine,
+        db_session,
+        authenticated_user,
+        authenticated_superuser,
+    ):
+        """Test deleting a user deletes their items without loading them."""
+        user_id = authenticated_user["user"].id
+        for i in range(3):
+            await test_client.post(
+                "/items/",
+                json={"name": f"Item {i}", "quantity": i},
+                headers=authenticated_user["headers"],
+            )
+
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record_statement)
+        try:
+            response = await test_client.delete(
+                f"/users/{user_id}", headers=authenticated_superuser["headers"]
+            )
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record_statement)
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not [statement for statement in statements if "FROM items" in statement]
+        assert await db_session.get(User, user_id) is None
+        assert await db_session.scalar(select(func.count()).select_from(Item)) == 0
+        assert await db_session.get(UserItemStats, user_id) is None
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_delete_user_in_background(
+        self,
+        test_client,
+        db_session,
+        authenticated_user,
+        authenticated_superuser,
+        mocker,
+    ):
+        """Test users with many items are deactivated, then purged in batches."""
+        mocker.patch("app.users.settings.USERS_BACKGROUND_PURGE_THRESHOLD", 3)
+        mocker.patch("app.purge.settings.USERS_PURGE_BATCH_SIZE", 2)
+        user_id = authenticated_user["user"].id
+        await test_client.post(
+            "/items/bulk",
+            json=[{"name": f"Item {i}"} for i in range(5)],
+            headers=authenticated_user["headers"],
+        )
+        purge_user = mocker.spy(purge, "purge_user")
+        on_after_delete = mocker.patch("app.users.UserManager.on_after_delete")
+
+        response = await test_client.delete(
+            f"/users/{user_id}", headers=authenticated_superuser["headers"]
+        )
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert purge_user.call_count == 1
+        user = await db_session.scalar(
+            select(User)
+            .where(User.id == user_id)
+            .execution_options(populate_existing=True)
+        )
+        assert user.is_active is False
+        response = await test_client.post(
+            "/items/", json={"name": "Late"}, headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        on_after_delete.assert_not_called()
+
+        await asyncio.gather(*purge_tasks)
+
+        db_session.expunge_all()
+        assert await db_session.get(User, user_id) is None
+        assert await db_session.scalar(select(func.count()).select_from(Item)) == 0
+        on_after_delete.assert_called_once()
+        assert on_after_delete.call_args.args[0].id == user_id
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_delete_user_below_purge_threshold(
+        self,
+        test_client,
+        db_session,
+        authenticated_user,
+        authenticated_superuser,
+        mocker,
+    ):
+        """Test users with few items are still deleted within the request."""
+        mocker.patch("app.users.settings.USERS_BACKGROUND_PURGE_THRESHOLD", 3)
+        user_id = authenticated_user["user"].id
+        await test_client.post(
+            "/items/", json={"name": "Item"}, headers=authenticated_user["headers"]
+        )
+
+        response = await test_client.delete(
+            f"/users/{user_id}", headers=authenticated_superuser["headers"]
+        )
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not purge_tasks
+        db_session.expunge_all()
+        assert await db_session.get(User, user_id) is None
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_authenticated_user_cache(
+        self, test_client, engine, authenticated_user, authenticated_superuser, mocker
+    ):
+        """Test authenticated users are looked up once, until they change."""
+        user_cache = mocker.patch("app.cache.user_cache", UserCache(10, 60))
+        # Look the user up for every token, rather than trusting its claims
+        mocker.patch("app.users.jwt_strategy.claims_lifetime_seconds", 0)
+        user_id = authenticated_user["user"].id
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            if '"user".hashed_password' in statement:
+                statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record_statement)
+        try:
+            for _ in range(3):
+                response = await test_client.get(
+                    "/items/", headers=authenticated_user["headers"]
+                )
+                assert response.status_code == status.HTTP_200_OK
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record_statement)
+
+        assert len(statements) == 1
+        assert user_cache.stats()["hits"] == 2
+
+        response = await test_client.patch(
+            f"/users/{user_id}",
+            json={"is_active": False},
+            headers=authenticated_superuser["headers"],
+        )
+        assert response.status_code == status.HTTP_200_OK
+        response = await test_client.get(
+            "/items/", headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_with_token_claims(
+        self, test_client, engine, db_session, authenticated_user
+    ):
+        """Test read endpoints trust recent token claims without a user lookup."""
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            if '"user".hashed_password' in statement:
+                statements.append(statement)
+
+        # Claims outlive changes to the user until they expire
+        await db_session.execute(
+            update(User)
+            .where(User.id == authenticated_user["user"].id)
+            .values(is_active=False)
+        )
+        await db_session.commit()
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record_statement)
+        try:
+            response = await test_client.get(
+                "/items/", headers=authenticated_user["headers"]
+            )
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record_statement)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert statements == []
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_with_expired_token_claims(
+        self, test_client, db_session, authenticated_user, mocker
+    ):
+        """Test tokens too old for their claims are checked against the user."""
+        mocker.patch("app.users.jwt_strategy.claims_lifetime_seconds", 0)
+        response = await test_client.get(
+            "/items/", headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        await db_session.execute(
+            update(User)
+            .where(User.id == authenticated_user["user"].id)
+            .values(is_active=False)
+        )
+        await db_session.commit()
+
+        response = await test_client.get(
+            "/items/", headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_with_invalid_token(self, test_client):
+        """Test read endpoints reject missing and invalid tokens."""
+        response = await test_client.get("/items/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = await test_client.get(
+            "/items/", headers={"Authorization": "Bearer invalid"}
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_refresh_token(self, test_client, db_session, authenticated_user):
+        """Test refreshing a token re-reads the user's claims."""
+        response = await test_client.post(
+            "/auth/jwt/refresh", headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["token_type"] == "bearer"
+        claims = await get_jwt_strategy().read_claims(response.json()["access_token"])
+        assert claims == UserClaims(id=authenticated_user["user"].id, is_active=True)
+
+        await db_session.execute(
+            update(User)
+            .where(User.id == authenticated_user["user"].id)
+            .values(is_active=False)
+        )
+        await db_session.commit()
+
+        response = await test_client.post(
+            "/auth/jwt/refresh", headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_users(
+        self, test_client, db_session, authenticated_user, authenticated_superuser
+    ):
+        """Test listing users page by page, with filters and item counts."""
+        headers = authenticated_superuser["headers"]
+        await db_session.execute(
+            insert(User).values(
+                [
+                    {
+                        "email": f"member{n}@example.com",
+                        "hashed_password": "x",
+                        "is_active": n != 2,
+                        "is_verified": n % 2 == 0,
+                    }
+                    for n in range(5)
+                ]
+                + [
+                    {"email": "member_x@example.com", "hashed_password": "x"},
+                    {"email": "Member5@example.com", "hashed_password": "x"},
+                ]
+            )
+        )
+        await db_session.commit()
+        await test_client.post(
+            "/items/bulk",
+            json=[{"name": "A"}, {"name": "B"}],
+            headers=authenticated_user["headers"],
+        )
+
+        response = await test_client.get(
+            "/users/", params={"size": 4, "include_total": True}, headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert [user["email"] for user in page["items"]] == [
+            "admin@example.com",
+            "member0@example.com",
+            "member1@example.com",
+            "member2@example.com",
+        ]
+        assert page["total"] == 9
+        assert page["items"][0]["item_count"] is None
+
+        response = await test_client.get(
+            "/users/",
+            params={"size": 5, "cursor": page["next_cursor"]},
+            headers=headers,
+        )
+        # Ordered case-insensitively too
+        assert [user["email"] for user in response.json()["items"]] == [
+            "member3@example.com",
+            "member4@example.com",
+            "Member5@example.com",
+            "member_x@example.com",
+            "test@example.com",
+        ]
+        assert response.json()["next_cursor"] is None
+
+        # "_" is matched literally, not as a LIKE wildcard
+        response = await test_client.get(
+            "/users/", params={"email_prefix": "member_"}, headers=headers
+        )
+        assert [user["email"] for user in response.json()["items"]] == [
+            "member_x@example.com"
+        ]
+
+        # Matched case-insensitively, like e-mail lookups
+        response = await test_client.get(
+            "/users/", params={"email_prefix": "MEMBER_"}, headers=headers
+        )
+        assert [user["email"] for user in response.json()["items"]] == [
+            "member_x@example.com"
+        ]
+
+        response = await test_client.get(
+            "/users/",
+            params={"email_prefix": "member", "is_active": True, "is_verified": True},
+            headers=headers,
+        )
+        assert [user["email"] for user in response.json()["items"]] == [
+            "member0@example.com",
+            "member4@example.com",
+        ]
+
+        response = await test_client.get(
+            "/users/",
+            params={"email_prefix": "t", "include_item_count": True},
+            headers=headers,
+        )
+        assert [
+            (user["email"], user["item_count"]) for user in response.json()["items"]
+        ] == [("test@example.com", 2)]
+
+        response = await test_client.get(
+            "/users/",
+            params={"email_prefix": "admin", "include_item_count": True},
+            headers=headers,
+        )
+        assert response.json()["items"][0]["item_count"] == 0
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_users_forbidden(self, test_client, authenticated_user):
+        """Test listing users as a regular user."""
+        response = await test_client.get(
+            "/users/", headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,33 @@
+import pytest
+from fastapi import status
+
+from app.jwks import SigningKeys
+from tests.test_jwks import generate_private_key, private_pem
+
+
+class TestWellKnown:
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_jwks(self, test_client, mocker):
+        """Test reading the public keys of access tokens."""
+        signing_keys = SigningKeys.from_pem(
+            "RS256", "current", private_pem(generate_private_key("RS256")), {}
+        )
+        mocker.patch("app.users.jwt_strategy.signing_keys", signing_keys)
+
+        response = await test_client.get("/.well-known/jwks.json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["Cache-Control"] == "public, max-age=300"
+        (key,) = response.json()["keys"]
+        assert key["kid"] == "current"
+        assert key["kty"] == "RSA"
+        assert key["alg"] == "RS256"
+        assert "d" not in key
+
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_read_jwks_with_shared_secret(self, test_client):
+        """Test no keys are published when tokens are signed with a secret."""
+        response = await test_client.get("/.well-known/jwks.json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"keys": []}
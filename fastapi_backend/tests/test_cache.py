@@ -0,0 +1,213 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.cache import CacheError, InMemoryCache, ItemPageCache, RedisCache, UserCache
+
+
+class FakeRedisServer:
+    """A Redis protocol server supporting the few commands the cache sends."""
+
+    def __init__(self, password=None):
+        self.password = password
+        self.data = {}
+        self.eval_reply = 0
+        # Read commands without ever replying, like a server that hung
+        self.stalled = False
+        # Seconds every reply takes, like a server under load
+        self.delay = 0
+        self.connections = 0
+        self.commands = []
+        self.handlers = set()
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+        # Connection handlers finish once their client has disconnected
+        await asyncio.gather(*self.handlers)
+
+    async def handle(self, reader, writer):
+        self.handlers.add(asyncio.current_task())
+        self.connections += 1
+        authenticated = self.password is None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                command = args[0].decode().upper()
+                self.commands.append(command)
+                if self.stalled:
+                    continue
+                await asyncio.sleep(self.delay)
+
+                if command == "AUTH":
+                    authenticated = args[1].decode() == self.password
+                    reply = b"+OK\r\n" if authenticated else b"-WRONGPASS\r\n"
+                elif not authenticated:
+                    reply = b"-NOAUTH Authentication required.\r\n"
+                elif command == "SELECT":
+                    reply = b"+OK\r\n"
+                elif command == "GET":
+                    value = self.data.get(args[1])
+                    reply = (
+                        b"$-1\r\n"
+                        if value is None
+                        else b"$%d\r\n%s\r\n" % (len(value), value)
+                    )
+                elif command == "SET":
+                    self.data[args[1]] = args[2]
+                    reply = b"+OK\r\n"
+                elif command == "EVAL":
+                    reply = b":%d\r\n" % self.eval_reply
+                else:
+                    reply = b"-ERR unknown command\r\n"
+                writer.write(reply)
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def test_in_memory_cache_evicts_least_recently_used():
+    cache = InMemoryCache(max_entries=2)
+    await cache.set("a", b"1", 60)
+    await cache.set("b", b"2", 60)
+    assert await cache.get("a") == b"1"
+
+    await cache.set("c", b"3", 60)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"1"
+    assert await cache.get("c") == b"3"
+    assert len(cache) == 2
+
+
+async def test_in_memory_cache_expires_entries(mocker):
+    monotonic = mocker.patch("app.cache.time.monotonic", return_value=100.0)
+    cache = InMemoryCache(max_entries=10)
+    await cache.set("a", b"1", 5)
+
+    monotonic.return_value = 104.0
+    assert await cache.get("a") == b"1"
+    monotonic.return_value = 105.0
+    assert await cache.get("a") is None
+    assert len(cache) == 0
+
+
+async def test_redis_cache():
+    async with FakeRedisServer(password="secret") as server:
+        cache = RedisCache(f"redis://:secret@127.0.0.1:{server.port}/2")
+
+        assert await cache.get("key") is None
+        await cache.set("key", b"value\r\nwith a line break", 1.5)
+        assert await cache.get("key") == b"value\r\nwith a line break"
+        await cache.close()
+
+    assert server.commands == ["AUTH", "SELECT", "GET", "SET", "GET"]
+
+
+async def test_redis_cache_concurrent_commands():
+    async with FakeRedisServer() as server:
+        server.delay = 0.05
+        cache = RedisCache(
+            f"redis://127.0.0.1:{server.port}", timeout=0.5, max_connections=10
+        )
+
+        # One at a time, these would take 2.5 seconds and time out
+        await asyncio.gather(*(cache.set(f"key{i}", b"%d" % i, 60) for i in range(50)))
+        values = await asyncio.gather(*(cache.get(f"key{i}") for i in range(50)))
+
+        assert values == [b"%d" % i for i in range(50)]
+        assert server.connections == 10
+        await cache.close()
+
+
+async def test_redis_cache_error_reply():
+    async with FakeRedisServer(password="secret") as server:
+        cache = RedisCache(f"redis://127.0.0.1:{server.port}")
+
+        with pytest.raises(CacheError, match="NOAUTH"):
+            await cache.get("key")
+        await cache.close()
+
+
+async def test_redis_cache_timeout():
+    async with FakeRedisServer() as server:
+        cache = RedisCache(f"redis://127.0.0.1:{server.port}", timeout=0.05)
+        server.stalled = True
+
+        # Commands queued behind the stalled one time out too
+        results = await asyncio.gather(
+            cache.get("key"), cache.get("other"), return_exceptions=True
+        )
+        assert all(isinstance(result, TimeoutError) for result in results)
+
+        server.stalled = False
+        await cache.set("key", b"value", 1)
+        assert await cache.get("key") == b"value"
+        await cache.close()
+
+
+async def test_item_page_cache():
+    page_cache = ItemPageCache(InMemoryCache(max_entries=10), ttl=60)
+    user_id = uuid.uuid4()
+
+    key = page_cache.page_key(user_id, 1, 1, 10)
+    assert page_cache.page_key(user_id, 1, 1, 10) == key
+    assert await page_cache.get(key) is None
+    await page_cache.set(key, b"page")
+    assert await page_cache.get(key) == b"page"
+
+    new_key = page_cache.page_key(user_id, 2, 1, 10)
+    assert new_key != key
+    assert await page_cache.get(new_key) is None
+    assert page_cache.stats() == {
+        "backend": "memory",
+        "hits": 1,
+        "misses": 2,
+        "errors": 0,
+    }
+
+
+async def test_item_page_cache_unavailable():
+    async with FakeRedisServer() as server:
+        port = server.port
+    page_cache = ItemPageCache(RedisCache(f"redis://127.0.0.1:{port}"), ttl=60)
+
+    assert await page_cache.get("key") is None
+    await page_cache.set("key", b"page")
+    assert page_cache.stats()["errors"] == 2
+
+
+def test_user_cache(mocker):
+    monotonic = mocker.patch("app.cache.time.monotonic", return_value=100.0)
+    user_cache = UserCache(max_entries=2, ttl=5)
+    user_ids = [uuid.uuid4() for _ in range(3)]
+    for user_id in user_ids:
+        user_cache.set(user_id, {"id": user_id})
+
+    assert user_cache.get(user_ids[0]) is None
+    assert user_cache.get(user_ids[1]) == {"id": user_ids[1]}
+    user_cache.invalidate(user_ids[1])
+    assert user_cache.get(user_ids[1]) is None
+    assert user_cache.get(user_ids[2]) == {"id": user_ids[2]}
+    monotonic.return_value = 105.0
+    assert user_cache.get(user_ids[2]) is None
+
+    assert user_cache.stats() == {
+        "entries": 0,
+        "hits": 2,
+        "misses": 3,
+        "hit_rate": 0.4,
+    }
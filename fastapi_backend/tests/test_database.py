@@ -1,14 +1,33 @@
+import asyncio
+import itertools
+import uuid
+
 import pytest
-from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+from sqlalchemy import NullPool, text
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine
 from fastapi_users.db import SQLAlchemyUserDatabase
 
+from app.cache import RedisCache, UserCache
+from app.config import settings
 from app.database import (
+    USER_CACHE_CHANNEL,
+    CachedUserDatabase,
+    InstrumentedQueuePool,
     async_session_maker,
     create_db_and_tables,
     get_async_session,
+    get_engine_options,
+    get_pool_stats,
+    get_read_async_session,
+    get_read_user_db,
     get_user_db,
+    has_recent_write,
+    listen_for_user_changes,
+    mark_recent_write,
+    user_changed,
 )
 from app.models import Base, User
+from tests.test_cache import FakeRedisServer
 
 
 @pytest.fixture
@@ -106,3 +125,215 @@ async def test_session_maker_configuration():
     # Create a test session
     async with async_session_maker() as session:
         assert isinstance(session, AsyncSession)
+
+
+def test_engine_options_null_pool():
+    assert get_engine_options("null") == {"poolclass": NullPool}
+
+
+def test_engine_options_queue_pool(mocker):
+    mock_settings = mocker.patch("app.database.settings")
+    mock_settings.DATABASE_POOL_SIZE = 7
+    mock_settings.DATABASE_MAX_OVERFLOW = 3
+
+    options = get_engine_options("queue")
+
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 7
+    assert options["max_overflow"] == 3
+    assert "connect_args" not in options
+
+
+def test_engine_options_pgbouncer():
+    options = get_engine_options("pgbouncer")
+
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+    name_func = options["connect_args"]["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_records_checkouts():
+    engine = create_async_engine(
+        settings.TEST_DATABASE_URL, **get_engine_options("queue")
+    )
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert engine.pool.checkedout() == 1
+
+        assert engine.pool.checkouts == 1
+        assert engine.pool.max_wait > 0
+    finally:
+        await engine.dispose()
+
+
+async def test_get_pool_stats(mocker):
+    engine = create_async_engine(
+        settings.TEST_DATABASE_URL, **get_engine_options("queue")
+    )
+    try:
+        mocker.patch("app.database.engine", engine)
+        mocker.patch("app.database.settings.DATABASE_POOL_MODE", "queue")
+
+        stats = get_pool_stats()
+
+        assert stats["mode"] == "queue"
+        assert stats["size"] == settings.DATABASE_POOL_SIZE
+        assert stats["checked_out"] == 0
+        assert stats["checkouts"] == 0
+        assert stats["avg_wait_ms"] == 0.0
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_read_async_session_without_replicas(mocker):
+    primary_session = mocker.AsyncMock(spec=AsyncSession)
+    mocker.patch("app.database.replica_session_makers", [])
+
+    session_generator = get_read_async_session(primary_session)
+    session = await session_generator.__anext__()
+
+    assert session is primary_session
+
+
+@pytest.mark.asyncio
+async def test_get_read_async_session_with_replicas(mocker):
+    primary_session = mocker.AsyncMock(spec=AsyncSession)
+    replica_sessions = []
+    replica_session_makers = []
+    for _ in range(2):
+        replica_session = mocker.AsyncMock(spec=AsyncSession)
+        replica_session.__aenter__.return_value = replica_session
+        replica_sessions.append(replica_session)
+        replica_session_makers.append(mocker.Mock(return_value=replica_session))
+    mocker.patch("app.database.replica_session_makers", replica_session_makers)
+    mocker.patch(
+        "app.database._replica_session_makers_cycle",
+        itertools.cycle(replica_session_makers),
+    )
+
+    sessions = []
+    for _ in range(3):
+        session_generator = get_read_async_session(primary_session)
+        sessions.append(await session_generator.__anext__())
+
+    # Replicas are used round-robin and the primary is never used
+    assert sessions == [replica_sessions[0], replica_sessions[1], replica_sessions[0]]
+
+
+@pytest.mark.asyncio
+async def test_get_read_user_db(mocker, mock_session):
+    primary_session = mocker.AsyncMock(spec=AsyncSession)
+    user_db_generator = get_read_user_db(mock_session, primary_session)
+    user_db = await user_db_generator.__anext__()
+
+    assert isinstance(user_db, CachedUserDatabase)
+    assert user_db.session == mock_session
+    assert user_db.primary_session == primary_session
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("recent_write", [False, True])
+async def test_cached_user_database_after_write_uses_primary(mocker, recent_write):
+    mocker.patch("app.cache.user_cache", None)
+    mocker.patch("app.database.has_recent_write", return_value=recent_write)
+    user = User(id=uuid.uuid4())
+    primary_session = mocker.AsyncMock(spec=AsyncSession)
+    read_session = mocker.AsyncMock(spec=AsyncSession)
+    for session in (primary_session, read_session):
+        result = mocker.Mock()
+        result.unique.return_value.scalar_one_or_none.return_value = user
+        session.execute.return_value = result
+    user_db = CachedUserDatabase(read_session, User, primary_session)
+
+    assert await user_db.get(user.id) is user
+    assert primary_session.execute.called == recent_write
+    assert read_session.execute.called != recent_write
+
+
+@pytest.mark.asyncio
+async def test_user_changed_pins_reads_to_primary(mocker, mock_session):
+    mocker.patch("app.cache.user_cache", None)
+    user_id = uuid.uuid4()
+
+    await user_changed(mock_session, user_id)
+
+    assert await has_recent_write(user_id)
+
+
+async def test_listen_for_user_changes(mocker):
+    engine = create_async_engine(settings.TEST_DATABASE_URL)
+    mocker.patch("app.database.engine", engine)
+    mocker.patch("app.database.settings.USERS_CACHE_NOTIFY", True)
+    user_cache = mocker.patch("app.cache.user_cache", UserCache(10, 60))
+    user_id = uuid.uuid4()
+    user_cache.set(user_id, {"id": user_id})
+
+    try:
+        async with listen_for_user_changes():
+            # As another worker would notify
+            async with engine.begin() as connection:
+                await connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": USER_CACHE_CHANNEL, "payload": str(user_id)},
+                )
+            for _ in range(100):
+                if user_cache.get(user_id) is None:
+                    break
+                await asyncio.sleep(0.01)
+            else:
+                pytest.fail("The cached user was not invalidated")
+    finally:
+        await engine.dispose()
+
+
+async def test_recent_write_window(mocker):
+    mocker.patch("app.database.settings.READ_YOUR_WRITES_SECONDS", 5)
+    monotonic = mocker.patch("app.database.time.monotonic", return_value=100.0)
+    user_id = uuid.uuid4()
+
+    assert not await has_recent_write(user_id)
+
+    await mark_recent_write(user_id)
+    assert await has_recent_write(user_id)
+
+    monotonic.return_value = 105.0
+    assert not await has_recent_write(user_id)
+
+
+async def test_recent_write_shared_through_redis(mocker):
+    async with FakeRedisServer() as server:
+        redis = RedisCache(f"redis://127.0.0.1:{server.port}")
+        mocker.patch("app.database.recent_writes_redis", redis)
+        user_id = uuid.uuid4()
+
+        assert not await has_recent_write(user_id)
+        await mark_recent_write(user_id)
+        # As another worker would see it
+        mocker.patch.dict("app.database._recent_writes", clear=True)
+        assert await has_recent_write(user_id)
+        await redis.close()
+
+
+async def test_recent_write_redis_unavailable(mocker):
+    mocker.patch("app.database._recent_writes_redis_retry_at", 0.0)
+    async with FakeRedisServer() as server:
+        port = server.port
+    redis = RedisCache(f"redis://127.0.0.1:{port}")
+    mocker.patch("app.database.recent_writes_redis", redis)
+    get = mocker.spy(redis, "get")
+
+    # Writes are still remembered locally, without asking Redis
+    user_id = uuid.uuid4()
+    await mark_recent_write(user_id)
+    assert await has_recent_write(user_id)
+    assert get.call_count == 0
+
+    # The other users read from the replicas, and Redis is left alone a while
+    assert not await has_recent_write(uuid.uuid4())
+    assert not await has_recent_write(uuid.uuid4())
+    assert get.call_count == 1
@@ -0,0 +1,117 @@
+import uuid
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from cryptography.hazmat.primitives.serialization import (
+    Encoding,
+    NoEncryption,
+    PrivateFormat,
+    PublicFormat,
+)
+
+from app.jwks import SigningKeys, load_signing_keys
+from app.models import User
+from app.users import ClaimsJWTStrategy, UserClaims
+
+
+def generate_private_key(algorithm):
+    if algorithm == "RS256":
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+def private_pem(key):
+    return key.private_bytes(Encoding.PEM, PrivateFormat.PKCS8, NoEncryption()).decode()
+
+
+def public_pem(key):
+    return (
+        key.public_key()
+        .public_bytes(Encoding.PEM, PublicFormat.SubjectPublicKeyInfo)
+        .decode()
+    )
+
+
+def make_strategy(signing_keys):
+    return ClaimsJWTStrategy(
+        secret="unused",
+        lifetime_seconds=3600,
+        claims_lifetime_seconds=300,
+        cache_size=10,
+        algorithm=signing_keys.algorithm,
+        signing_keys=signing_keys,
+    )
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "ES256"])
+async def test_tokens_verify_with_jwks(algorithm):
+    signing_keys = SigningKeys.from_pem(
+        algorithm, "current", private_pem(generate_private_key(algorithm)), {}
+    )
+    user = User(id=uuid.uuid4(), is_active=True)
+    token = await make_strategy(signing_keys).write_token(user)
+
+    assert jwt.get_unverified_header(token)["kid"] == "current"
+    # As a downstream service would, with nothing but the published keys
+    jwk = jwt.PyJWKSet.from_dict(signing_keys.jwks())["current"]
+    data = jwt.decode(
+        token, jwk.key, algorithms=[algorithm], audience="fastapi-users:auth"
+    )
+    assert data["sub"] == str(user.id)
+
+
+async def test_key_rotation():
+    previous_key = generate_private_key("ES256")
+    previous_keys = SigningKeys.from_pem(
+        "ES256", "previous", private_pem(previous_key), {}
+    )
+    user = User(id=uuid.uuid4(), is_active=True)
+    previous_token = await make_strategy(previous_keys).write_token(user)
+
+    next_key = generate_private_key("ES256")
+    signing_keys = SigningKeys.from_pem(
+        "ES256",
+        "current",
+        private_pem(generate_private_key("ES256")),
+        {"previous": public_pem(previous_key), "next": public_pem(next_key)},
+    )
+    strategy = make_strategy(signing_keys)
+
+    assert [key["kid"] for key in signing_keys.jwks()["keys"]] == [
+        "previous",
+        "next",
+        "current",
+    ]
+    assert await strategy.read_claims(previous_token) == UserClaims(
+        id=user.id, is_active=True
+    )
+    assert await strategy.read_claims(await strategy.write_token(user)) is not None
+
+    # Tokens signed with a key that is no longer published are rejected
+    retired_keys = SigningKeys.from_pem(
+        "ES256", "retired", private_pem(generate_private_key("ES256")), {}
+    )
+    assert strategy.decode(await make_strategy(retired_keys).write_token(user)) is None
+
+
+def test_signing_key_must_match_algorithm():
+    with pytest.raises(ValueError, match="not a RS256 key"):
+        SigningKeys.from_pem(
+            "RS256", "current", private_pem(generate_private_key("ES256")), {}
+        )
+
+
+def test_load_signing_keys(mocker):
+    assert load_signing_keys() is None
+
+    mocker.patch("app.jwks.settings.ALGORITHM", "ES256")
+    with pytest.raises(ValueError, match="ACCESS_PRIVATE_KEY"):
+        load_signing_keys()
+
+    mocker.patch(
+        "app.jwks.settings.ACCESS_PRIVATE_KEY",
+        private_pem(generate_private_key("ES256")),
+    )
+    mocker.patch("app.jwks.settings.ACCESS_KEY_ID", "current")
+    assert load_signing_keys().key_id == "current"
@@ -0,0 +1,61 @@
+import base64
+import uuid
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models import Item
+from app.pagination import _after, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    item_id = uuid.uuid4()
+    ordering = [(Item.name, True), (Item.id, False)]
+
+    cursor = encode_cursor("next", ["name", item_id])
+
+    assert decode_cursor(cursor, ordering) == ("next", ["name", item_id])
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-a-cursor",
+        encode_cursor("sideways", [str(uuid.uuid4())]),
+        encode_cursor("next", []),
+        base64.urlsafe_b64encode(b'["next", 5]').decode(),
+        encode_cursor("next", [[5]]),
+        encode_cursor("next", ["not-a-uuid"]),
+    ],
+)
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, [(Item.id, False)])
+
+
+def test_decode_cursor_checks_value_types():
+    ordering = [(Item.name, False), (Item.quantity, False)]
+
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("next", [5, 1]), ordering)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("next", ["name", True]), ordering)
+    assert decode_cursor(encode_cursor("next", ["name", 1]), ordering) == (
+        "next",
+        ["name", 1],
+    )
+
+
+def test_after_uses_row_comparison_for_uniform_ordering():
+    clause = _after([(Item.name, False), (Item.id, False)], ["name", uuid.uuid4()])
+
+    sql = str(clause.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("(items.name, items.id) >")
+
+
+def test_after_expands_mixed_ordering():
+    clause = _after([(Item.name, True), (Item.id, False)], ["name", uuid.uuid4()])
+
+    sql = str(clause.compile(dialect=postgresql.dialect()))
+    assert "items.name < " in sql
+    assert "items.name = " in sql and "items.id > " in sql
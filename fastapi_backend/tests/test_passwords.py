@@ -0,0 +1,29 @@
+import threading
+
+from app import passwords
+from app.passwords import hash_password, verify_and_update_password
+
+
+async def test_password_hashing_runs_in_workers(mocker):
+    threads = []
+
+    def record_thread(*args):
+        threads.append(threading.current_thread().name)
+        return "hash"
+
+    mocker.patch.object(passwords.password_helper, "hash", record_thread)
+
+    assert await hash_password("Password123#") == "hash"
+    assert threads[0].startswith("password")
+
+
+async def test_password_hashing_without_workers(mocker):
+    mocker.patch("app.passwords.password_executor", None)
+
+    hashed_password = await hash_password("Password123#")
+
+    assert await verify_and_update_password("Password123#", hashed_password) == (
+        True,
+        None,
+    )
+    assert (await verify_and_update_password("Wrong123#", hashed_password))[0] is False
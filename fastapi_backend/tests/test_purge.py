@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import uuid
+
+import pytest
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models import Item, User
+from app.purge import purge_tasks, purge_user, schedule_user_purge
+
+
+async def test_purge_user(engine, db_session):
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    await db_session.execute(
+        insert(User).values(
+            [
+                {"id": id_, "email": f"{id_}@example.com", "hashed_password": "x"}
+                for id_ in (user_id, other_user_id)
+            ]
+        )
+    )
+    await db_session.execute(
+        insert(Item).values(
+            [{"name": f"Item {i}", "user_id": user_id} for i in range(5)]
+            + [{"name": "Other", "user_id": other_user_id}]
+        )
+    )
+    await db_session.commit()
+
+    commits = []
+
+    def record_commit(conn):
+        commits.append(conn)
+
+    event.listen(engine.sync_engine, "commit", record_commit)
+    try:
+        await purge_user(
+            async_sessionmaker(engine, expire_on_commit=False), user_id, batch_size=2
+        )
+    finally:
+        event.remove(engine.sync_engine, "commit", record_commit)
+
+    # Three batches of items, then the user
+    assert len(commits) == 4
+    assert await db_session.scalar(select(func.count()).select_from(User)) == 1
+    assert (await db_session.scalars(select(Item.user_id))).all() == [other_user_id]
+
+
+async def test_schedule_user_purge_logs_failures(mocker, caplog):
+    mocker.patch("app.purge.purge_user", side_effect=OSError("Connection lost"))
+    on_purged = mocker.AsyncMock()
+    user_id = uuid.uuid4()
+
+    with caplog.at_level(logging.ERROR, logger="app.purge"):
+        task = schedule_user_purge(mocker.Mock(), user_id, on_purged)
+        with pytest.raises(OSError):
+            await task
+        # Done callbacks run on the next iteration of the loop
+        await asyncio.sleep(0)
+
+    assert not purge_tasks
+    on_purged.assert_not_called()
+    assert f"Purging user {user_id} failed" in caplog.text
+    assert "Connection lost" in caplog.text
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+
+import pytest
+from fakeredis import TcpFakeServer
+
+from app.cache import RedisCache
+from app.rate_limit import (
+    AuthRateLimiter,
+    InMemoryRateLimitBackend,
+    RateLimit,
+    RedisRateLimitBackend,
+)
+from tests.test_cache import FakeRedisServer
+
+
+async def test_in_memory_rate_limit(mocker):
+    monotonic = mocker.patch("app.rate_limit.time.monotonic", return_value=100.0)
+    backend = InMemoryRateLimitBackend(max_keys=10)
+    limit = RateLimit(burst=2, per_minute=30)
+
+    assert await backend.take("key", limit) == 0
+    assert await backend.take("key", limit) == 0
+    assert await backend.take("key", limit) == 2.0
+    assert await backend.take("other", limit) == 0
+
+    monotonic.return_value = 101.0
+    assert await backend.take("key", limit) == 1.0
+    monotonic.return_value = 102.0
+    assert await backend.take("key", limit) == 0
+
+
+async def test_in_memory_rate_limit_drops_least_recently_used():
+    backend = InMemoryRateLimitBackend(max_keys=1)
+    limit = RateLimit(burst=1, per_minute=1)
+
+    assert await backend.take("a", limit) == 0
+    assert await backend.take("b", limit) == 0
+    # The bucket of "a" was dropped, so it starts full again
+    assert await backend.take("a", limit) == 0
+
+
+@pytest.fixture
+def redis_url():
+    """URL of an in-process Redis server, which runs Lua scripts."""
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+async def test_redis_rate_limit_script(redis_url):
+    redis = RedisCache(redis_url)
+    backend = RedisRateLimitBackend(redis)
+    limit = RateLimit(burst=2, per_minute=600)
+
+    assert await backend.take("key", limit) == 0
+    assert await backend.take("key", limit) == 0
+    assert 0 < await backend.take("key", limit) <= 0.1
+    assert await backend.take("other", limit) == 0
+
+    # A token is added every 0.1 second
+    await asyncio.sleep(0.15)
+    assert await backend.take("key", limit) == 0
+    assert await backend.take("key", limit) > 0
+    await redis.close()
+
+
+async def test_redis_rate_limit():
+    async with FakeRedisServer() as server:
+        redis = RedisCache(f"redis://127.0.0.1:{server.port}")
+        backend = RedisRateLimitBackend(redis)
+        limit = RateLimit(burst=5, per_minute=60)
+
+        assert await backend.take("key", limit) == 0
+        server.eval_reply = 1500
+        assert await backend.take("key", limit) == 1.5
+        await redis.close()
+
+    assert server.commands == ["EVAL", "EVAL"]
+
+
+async def test_auth_rate_limiter(mocker):
+    mocker.patch("app.rate_limit.time.monotonic", return_value=100.0)
+    limiter = AuthRateLimiter(
+        InMemoryRateLimitBackend(max_keys=10),
+        ip_limit=RateLimit(burst=3, per_minute=60),
+        email_limit=RateLimit(burst=1, per_minute=60),
+    )
+
+    assert await limiter.check("10.0.0.1", "user@example.com") == 0
+    assert await limiter.check("10.0.0.1", " USER@example.com") == 1.0
+    assert await limiter.check("10.0.0.1", "other@example.com") == 0
+    assert await limiter.check("10.0.0.1", None) == 1.0
+    assert await limiter.check("10.0.0.2", None) == 0
+    assert limiter.stats() == {
+        "backend": "memory",
+        "allowed": 3,
+        "rejected": 2,
+        "errors": 0,
+    }
+
+
+async def test_auth_rate_limiter_backend_unavailable():
+    async with FakeRedisServer() as server:
+        port = server.port
+    limiter = AuthRateLimiter(
+        RedisRateLimitBackend(RedisCache(f"redis://127.0.0.1:{port}")),
+        ip_limit=RateLimit(burst=1, per_minute=1),
+        email_limit=RateLimit(burst=1, per_minute=1),
+    )
+
+    assert await limiter.check("10.0.0.1", "user@example.com") == 0
+    assert limiter.stats()["errors"] == 2
+
+
+async def test_auth_rate_limiter_falls_back_to_memory():
+    async with FakeRedisServer() as server:
+        port = server.port
+    limiter = AuthRateLimiter(
+        RedisRateLimitBackend(RedisCache(f"redis://127.0.0.1:{port}")),
+        ip_limit=RateLimit(burst=1, per_minute=1),
+        email_limit=RateLimit(burst=5, per_minute=1),
+        fallback=InMemoryRateLimitBackend(max_keys=10),
+    )
+
+    assert await limiter.check("10.0.0.1", "user@example.com") == 0
+    assert await limiter.check("10.0.0.1", "user@example.com") > 0
+    assert limiter.stats()["rejected"] == 1
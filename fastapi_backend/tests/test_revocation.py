@@ -0,0 +1,142 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import revocation
+from app.models import RevokedToken
+from app.revocation import BloomFilter, RevocationList, keep_revocations_fresh
+
+
+@pytest.fixture
+def session_maker(engine):
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+def in_an_hour():
+    return datetime.now(timezone.utc) + timedelta(hours=1)
+
+
+def test_bloom_filter():
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [uuid.uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom_filter.add(item)
+
+    assert all(item in bloom_filter for item in items)
+    false_positives = sum(uuid.uuid4().hex in bloom_filter for _ in range(10_000))
+    assert false_positives < 300
+
+
+async def test_revocation_list(session_maker):
+    revocations = RevocationList(session_maker, capacity=100)
+    other_worker_revocations = RevocationList(session_maker, capacity=100)
+    await other_worker_revocations.rebuild()
+    jti = uuid.uuid4().hex
+
+    await revocations.revoke(jti, in_an_hour())
+
+    assert await revocations.is_revoked(jti)
+    assert not await revocations.is_revoked(uuid.uuid4().hex)
+    # Tokens the filter rules out, or that are known, cost no query
+    assert revocations.stats() == {"checks": 2, "lookups": 0}
+
+    assert not await other_worker_revocations.is_revoked(jti)
+    await other_worker_revocations.refresh()
+    assert await other_worker_revocations.is_revoked(jti)
+
+
+async def test_revocation_list_false_positive(session_maker, mocker):
+    revocations = RevocationList(session_maker, capacity=100)
+    mocker.patch.object(BloomFilter, "__contains__", return_value=True)
+    jti = uuid.uuid4().hex
+
+    assert not await revocations.is_revoked(jti)
+    assert not await revocations.is_revoked(jti)
+    assert revocations.lookups == 1
+
+
+async def test_revocation_list_rebuild(session_maker, db_session):
+    expired_jti, jti = uuid.uuid4().hex, uuid.uuid4().hex
+    await db_session.execute(
+        insert(RevokedToken).values(
+            [
+                {
+                    "jti": expired_jti,
+                    "expires_at": datetime.now(timezone.utc) - timedelta(seconds=1),
+                },
+                {"jti": jti, "expires_at": in_an_hour()},
+            ]
+        )
+    )
+    await db_session.commit()
+    revocations = RevocationList(session_maker, capacity=100)
+
+    await revocations.rebuild()
+
+    assert await revocations.is_revoked(jti)
+    assert expired_jti not in revocations.filter
+    assert (await db_session.scalars(select(RevokedToken.jti))).all() == [jti]
+
+
+async def test_revocation_list_rebuild_keeps_answering(session_maker, mocker):
+    revocations = RevocationList(session_maker, capacity=100)
+    jti, revoked_meanwhile_jti = uuid.uuid4().hex, uuid.uuid4().hex
+    await revocations.revoke(jti, in_an_hour())
+    read_revocations = revocations._read_revocations
+
+    async def read_while_checking(since):
+        # The tokens revoked so far stay revoked while the mirror is rebuilt
+        assert await revocations.is_revoked(jti)
+        rows = await read_revocations(since)
+        await revocations.revoke(revoked_meanwhile_jti, in_an_hour())
+        return rows
+
+    mocker.patch.object(revocations, "_read_revocations", read_while_checking)
+
+    await revocations.rebuild()
+
+    assert await revocations.is_revoked(jti)
+    assert await revocations.is_revoked(revoked_meanwhile_jti)
+    assert revocations.lookups == 0
+
+
+async def test_keep_revocations_fresh(session_maker, mocker):
+    revocations = mocker.patch.object(
+        revocation, "revocation_list", RevocationList(session_maker, capacity=100)
+    )
+    mocker.patch("app.revocation.settings.TOKEN_REVOCATION_REFRESH_SECONDS", 0.01)
+    other_worker_revocations = RevocationList(session_maker, capacity=100)
+    jti = uuid.uuid4().hex
+
+    async with keep_revocations_fresh():
+        await other_worker_revocations.revoke(jti, in_an_hour())
+        for _ in range(100):
+            if jti in revocations.filter:
+                break
+            await asyncio.sleep(0.01)
+        else:
+            pytest.fail("The revocation was not picked up")
+
+
+async def test_keep_revocations_fresh_database_down(mocker, caplog):
+    revocations = mocker.patch.object(
+        revocation, "revocation_list", mocker.Mock(spec=RevocationList)
+    )
+    mocker.patch("app.revocation.settings.TOKEN_REVOCATION_REFRESH_SECONDS", 0.01)
+    # The database is down at startup, and back by the first refresh
+    revocations.rebuild.side_effect = [OSError("Connection refused"), None]
+
+    async with keep_revocations_fresh():
+        for _ in range(100):
+            if revocations.rebuild.await_count == 2:
+                break
+            await asyncio.sleep(0.01)
+        else:
+            pytest.fail("The revocation list was not rebuilt again")
+
+    assert "Rebuilding the token revocation list failed" in caplog.text
+    assert "Connection refused" in caplog.text
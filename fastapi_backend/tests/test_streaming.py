@@ -0,0 +1,91 @@
+import pytest
+
+from app.streaming import RecordTooLong, iter_csv_records, iter_lines
+
+
+async def collect(iterator):
+    return [value async for value in iterator]
+
+
+async def iter_chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def test_iter_lines_across_chunks():
+    chunks = iter_chunks(b"first\r\nsec", b"ond\n\xc3", b"\xa9\n", b"last")
+
+    assert await collect(iter_lines(chunks)) == [
+        (1, "first"),
+        (2, "second"),
+        (3, "é"),
+        (4, "last"),
+    ]
+
+
+async def test_iter_lines_trailing_newline():
+    assert await collect(iter_lines(iter_chunks(b"a\nb\n"))) == [(1, "a"), (2, "b")]
+
+
+async def test_iter_lines_drops_byte_order_mark():
+    chunks = iter_chunks(b"\xef\xbb", b"\xbfname\n\xef\xbb\xbfkept")
+
+    assert await collect(iter_lines(chunks)) == [(1, "name"), (2, "\ufeffkept")]
+
+
+async def test_iter_csv_records_multiline_fields():
+    lines = iter_lines(iter_chunks(b'a,"b\nc",d\n\ne,f\n"g'), keepends=True)
+
+    assert await collect(iter_csv_records(lines)) == [
+        (1, ["a", "b\nc", "d"]),
+        (4, ["e", "f"]),
+        (5, ["g"]),
+    ]
+
+
+async def test_iter_lines_keepends():
+    chunks = iter_chunks(b"a\r", b"\nb\nc")
+
+    assert await collect(iter_lines(chunks, keepends=True)) == [
+        (1, "a\r\n"),
+        (2, "b\n"),
+        (3, "c"),
+    ]
+
+
+async def test_iter_lines_max_length():
+    chunks = iter_chunks(b"abc\r\nab", b"cd\n")
+
+    lines = iter_lines(chunks, 3)
+    assert await anext(lines) == (1, "abc")
+    with pytest.raises(RecordTooLong, match="Line 2 is longer than 3 characters"):
+        await anext(lines)
+
+
+async def test_iter_lines_max_length_incomplete_line():
+    """Test a line is rejected before its end, without buffering all of it."""
+
+    async def endless_line():
+        while True:
+            yield b"x" * 10
+
+    with pytest.raises(RecordTooLong):
+        await collect(iter_lines(endless_line(), 25))
+
+
+async def test_iter_csv_records_keeps_line_ends():
+    lines = iter_lines(iter_chunks(b'"a\r\nb",c\r\n"d\ne",f\n'), keepends=True)
+
+    assert await collect(iter_csv_records(lines)) == [
+        (1, ["a\r\nb", "c"]),
+        (3, ["d\ne", "f"]),
+    ]
+
+
+async def test_iter_csv_records_max_length():
+    lines = iter_lines(iter_chunks(b'ab,c\r\n"d\r\ne"\r\n'), keepends=True)
+
+    records = iter_csv_records(lines, 5)
+    assert await anext(records) == (1, ["ab", "c"])
+    with pytest.raises(RecordTooLong, match="Line 2 is longer than 5 characters"):
+        await anext(records)
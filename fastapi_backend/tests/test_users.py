@@ -0,0 +1,117 @@
+import time
+import uuid
+
+import jwt
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import users
+from app.models import User
+from app.users import (
+    ClaimsJWTStrategy,
+    UserClaims,
+    get_jwt_strategy,
+    get_user_read_session,
+)
+
+
+@pytest.fixture
+def user():
+    return User(id=uuid.uuid4(), email="user@example.com")
+
+
+@pytest.mark.asyncio
+async def test_get_user_read_session_uses_replica(mocker, user):
+    session = mocker.AsyncMock(spec=AsyncSession)
+    read_session = mocker.AsyncMock(spec=AsyncSession)
+    mocker.patch("app.users.has_recent_write", return_value=False)
+
+    assert await get_user_read_session(user, session, read_session) is read_session
+
+
+@pytest.mark.asyncio
+async def test_get_user_read_session_after_write_uses_primary(mocker, user):
+    session = mocker.AsyncMock(spec=AsyncSession)
+    read_session = mocker.AsyncMock(spec=AsyncSession)
+    has_recent_write = mocker.patch("app.users.has_recent_write", return_value=True)
+
+    assert await get_user_read_session(user, session, read_session) is session
+    has_recent_write.assert_called_once_with(user.id)
+
+
+@pytest.mark.asyncio
+async def test_get_user_read_session_without_replicas(mocker, user):
+    session = mocker.AsyncMock(spec=AsyncSession)
+    has_recent_write = mocker.patch("app.users.has_recent_write", return_value=False)
+
+    assert await get_user_read_session(user, session, session) is session
+    has_recent_write.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_read_claims(mocker, user):
+    time = mocker.patch("app.users.time.time", return_value=1_000_000.0)
+    mocker.patch("app.users.jwt_strategy.claims_lifetime_seconds", 300)
+    user.is_active = False
+    strategy = get_jwt_strategy()
+    token = await strategy.write_token(user)
+
+    assert await strategy.read_claims(token) == UserClaims(id=user.id, is_active=False)
+    time.return_value = 1_000_300.0
+    assert await get_jwt_strategy().read_claims(token) is None
+
+
+@pytest.mark.asyncio
+async def test_read_claims_invalid_token():
+    assert await get_jwt_strategy().read_claims("invalid") is None
+
+
+def make_strategy(cache_size):
+    return ClaimsJWTStrategy(
+        secret="secret",
+        lifetime_seconds=3600,
+        claims_lifetime_seconds=300,
+        cache_size=cache_size,
+    )
+
+
+@pytest.mark.asyncio
+async def test_decoded_tokens_are_cached(mocker, user):
+    strategy = make_strategy(cache_size=1)
+    decode_jwt = mocker.spy(users, "decode_jwt")
+    user.is_active = True
+    token = await strategy.write_token(user)
+    other_token = await strategy.write_token(User(id=uuid.uuid4(), is_active=True))
+
+    claims = await strategy.read_claims(token)
+    assert await strategy.read_claims(token) == claims
+    assert decode_jwt.call_count == 1
+
+    # Only the most recently used token is kept
+    assert await strategy.read_claims(other_token) is not None
+    assert await strategy.read_claims(token) == claims
+    assert decode_jwt.call_count == 3
+    assert strategy.stats() == {"entries": 1, "hits": 1, "misses": 3}
+
+
+@pytest.mark.asyncio
+async def test_decoded_tokens_expire(mocker, user):
+    strategy = make_strategy(cache_size=10)
+    user.is_active = True
+    token = await strategy.write_token(user)
+    assert strategy.decode(token) is not None
+
+    # Once the token expires, its payload is verified again, which rejects it
+    mocker.patch("app.users.time.time", return_value=time.time() + 3600)
+    decode_jwt = mocker.patch("app.users.decode_jwt", side_effect=jwt.PyJWTError)
+    assert strategy.decode(token) is None
+    assert decode_jwt.call_count == 1
+    assert strategy.stats()["entries"] == 0
+
+
+def test_invalid_tokens_are_not_cached():
+    strategy = make_strategy(cache_size=10)
+
+    assert strategy.decode("invalid") is None
+    assert strategy.decode("invalid") is None
+    assert strategy.stats() == {"entries": 0, "hits": 0, "misses": 2}
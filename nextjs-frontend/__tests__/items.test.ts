@@ -0,0 +1,63 @@
+import { fetchItems } from "@/components/actions/items-action";
+import { readItem } from "@/app/clientService";
+
+jest.mock("../app/clientService", () => ({
+  readItem: jest.fn(),
+}));
+
+jest.mock("next/headers", () => ({
+  cookies: jest.fn().mockResolvedValue({
+    get: jest.fn().mockReturnValue({ value: "1245token" }),
+  }),
+}));
+
+jest.mock("next/cache", () => ({
+  revalidatePath: jest.fn(),
+}));
+
+jest.mock("next/navigation", () => ({
+  redirect: jest.fn(),
+}));
+
+describe("fetchItems action", () => {
+  const page = { items: [], total: 0, page: 1, size: 10, pages: 0 };
+
+  beforeEach(() => {
+    jest.clearAllMocks();
+  });
+
+  it("should revalidate the page it already has with its ETag", async () => {
+    (readItem as jest.Mock).mockResolvedValueOnce({
+      data: page,
+      status: 200,
+      headers: { etag: 'W/"abc-1"' },
+    });
+
+    expect(await fetchItems(1, 10)).toEqual(page);
+    expect((readItem as jest.Mock).mock.calls[0][0].headers).toEqual({
+      Authorization: "Bearer 1245token",
+    });
+
+    (readItem as jest.Mock).mockResolvedValueOnce({
+      data: "",
+      status: 304,
+      headers: { etag: 'W/"abc-1"' },
+    });
+
+    expect(await fetchItems(1, 10)).toEqual(page);
+    expect((readItem as jest.Mock).mock.calls[1][0].headers).toEqual({
+      Authorization: "Bearer 1245token",
+      "If-None-Match": 'W/"abc-1"',
+    });
+  });
+
+  it("should return an error if the server call fails", async () => {
+    (readItem as jest.Mock).mockResolvedValue({
+      error: { detail: "Unauthorized" },
+    });
+
+    const result = await fetchItems(2, 10);
+
+    expect(result).toEqual({ message: { detail: "Unauthorized" } });
+  });
+});
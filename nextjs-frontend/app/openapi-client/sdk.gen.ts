@@ -12,6 +12,8 @@ import type {
   AuthJwtLoginResponse,
   AuthJwtLogoutError,
   AuthJwtLogoutResponse,
+  RefreshTokenError,
+  RefreshTokenResponse,
   RegisterRegisterData,
   RegisterRegisterError,
   RegisterRegisterResponse,
@@ -27,6 +29,9 @@ import type {
   VerifyVerifyData,
   VerifyVerifyError,
   VerifyVerifyResponse,
+  ReadUsersData,
+  ReadUsersError,
+  ReadUsersResponse,
   UsersCurrentUserError,
   UsersCurrentUserResponse,
   UsersPatchCurrentUserData,
@@ -47,9 +52,33 @@ import type {
   CreateItemData,
   CreateItemError,
   CreateItemResponse,
+  ReadItemCursorData,
+  ReadItemCursorError,
+  ReadItemCursorResponse,
+  ReadItemStatsError,
+  ReadItemStatsResponse,
+  SearchItemsData,
+  SearchItemsError,
+  SearchItemsResponse,
+  ExportItemsData,
+  ExportItemsError,
+  ExportItemsResponse,
+  ImportItemsData,
+  ImportItemsError,
+  ImportItemsResponse,
+  CreateItemsBulkData,
+  CreateItemsBulkError,
+  CreateItemsBulkResponse,
+  DeleteItemsBulkData,
+  DeleteItemsBulkError,
+  DeleteItemsBulkResponse,
   DeleteItemData,
   DeleteItemError,
   DeleteItemResponse,
+  ReadMetricsError,
+  ReadMetricsResponse,
+  ReadJwksError,
+  ReadJwksResponse,
 } from "./types.gen";
 
 export const client = createClient(createConfig());
@@ -91,6 +120,23 @@ export const authJwtLogout = <ThrowOnError extends boolean = false>(
   });
 };
 
+/**
+ * Refresh Token
+ * Issue a new access token, with claims re-read from the database.
+ */
+export const refreshToken = <ThrowOnError extends boolean = false>(
+  options?: OptionsLegacyParser<unknown, ThrowOnError>,
+) => {
+  return (options?.client ?? client).post<
+    RefreshTokenResponse,
+    RefreshTokenError,
+    ThrowOnError
+  >({
+    ...options,
+    url: "/auth/jwt/refresh",
+  });
+};
+
 /**
  * Register:Register
  */
@@ -171,6 +217,23 @@ export const verifyVerify = <ThrowOnError extends boolean = false>(
   });
 };
 
+/**
+ * Read Users
+ * List users by e-mail, for superusers.
+ */
+export const readUsers = <ThrowOnError extends boolean = false>(
+  options?: OptionsLegacyParser<ReadUsersData, ThrowOnError>,
+) => {
+  return (options?.client ?? client).get<
+    ReadUsersResponse,
+    ReadUsersError,
+    ThrowOnError
+  >({
+    ...options,
+    url: "/users/",
+  });
+};
+
 /**
  * Users:Current User
  */
@@ -269,6 +332,10 @@ export const readItem = <ThrowOnError extends boolean = false>(
 
 /**
  * Create Item
+ * Create an item, reading it back from the INSERT itself.
+ *
+ * The response is built before committing, so neither a refresh nor an
+ * attribute reload after the commit expires the instance is needed.
  */
 export const createItem = <ThrowOnError extends boolean = false>(
   options: OptionsLegacyParser<CreateItemData, ThrowOnError>,
@@ -283,6 +350,132 @@ export const createItem = <ThrowOnError extends boolean = false>(
   });
 };
 
+/**
+ * Read Item Cursor
+ */
+export const readItemCursor = <ThrowOnError extends boolean = false>(
+  options?: OptionsLegacyParser<ReadItemCursorData, ThrowOnError>,
+) => {
+  return (options?.client ?? client).get<
+    ReadItemCursorResponse,
+    ReadItemCursorError,
+    ThrowOnError
+  >({
+    ...options,
+    url: "/items/cursor",
+  });
+};
+
+/**
+ * Read Item Stats
+ * Read the user's item count and total quantity, maintained by writes.
+ */
+export const readItemStats = <ThrowOnError extends boolean = false>(
+  options?: OptionsLegacyParser<unknown, ThrowOnError>,
+) => {
+  return (options?.client ?? client).get<
+    ReadItemStatsResponse,
+    ReadItemStatsError,
+    ThrowOnError
+  >({
+    ...options,
+    url: "/items/stats",
+  });
+};
+
+/**
+ * Search Items
+ * Search the user's items by name and description, best matches first.
+ *
+ * The terms are matched as words, in web search syntax (quotes, ``or`` and
+ * ``-``), and as a whole as a substring of names, which rank last.
+ */
+export const searchItems = <ThrowOnError extends boolean = false>(
+  options: OptionsLegacyParser<SearchItemsData, ThrowOnError>,
+) => {
+  return (options?.client ?? client).get<
+    SearchItemsResponse,
+    SearchItemsError,
+    ThrowOnError
+  >({
+    ...options,
+    url: "/items/search",
+  });
+};
+
+/**
+ * Export Items
+ */
+export const exportItems = <ThrowOnError extends boolean = false>(
+  options?: OptionsLegacyParser<ExportItemsData, ThrowOnError>,
+) => {
+  return (options?.client ?? client).get<
+    ExportItemsResponse,
+    ExportItemsError,
+    ThrowOnError
+  >({
+    ...options,
+    url: "/items/export",
+  });
+};
+
+/**
+ * Import Items
+ * Import items from a CSV or NDJSON body as it is being uploaded.
+ *
+ * Valid rows are loaded with COPY in batches of ``ITEMS_IMPORT_BATCH_SIZE``
+ * and committed together at the end, invalid rows are reported back.
+ */
+export const importItems = <ThrowOnError extends boolean = false>(
+  options: OptionsLegacyParser<ImportItemsData, ThrowOnError>,
+) => {
+  return (options?.client ?? client).post<
+    ImportItemsResponse,
+    ImportItemsError,
+    ThrowOnError
+  >({
+    ...options,
+    headers: {
+      "Content-Type": "application/x-ndjson",
+      ...options?.headers,
+    },
+    url: "/items/import",
+  });
+};
+
+/**
+ * Create Items Bulk
+ * Create all of ``items`` in one transaction, or none of them.
+ */
+export const createItemsBulk = <ThrowOnError extends boolean = false>(
+  options: OptionsLegacyParser<CreateItemsBulkData, ThrowOnError>,
+) => {
+  return (options?.client ?? client).post<
+    CreateItemsBulkResponse,
+    CreateItemsBulkError,
+    ThrowOnError
+  >({
+    ...options,
+    url: "/items/bulk",
+  });
+};
+
+/**
+ * Delete Items Bulk
+ */
+export const deleteItemsBulk = <ThrowOnError extends boolean = false>(
+  options: OptionsLegacyParser<DeleteItemsBulkData, ThrowOnError>,
+) => {
+  return (options?.client ?? client).post<
+    DeleteItemsBulkResponse,
+    DeleteItemsBulkError,
+    ThrowOnError
+  >({
+    ...options,
+    url: "/items/bulk-delete",
+  });
+};
+
 /**
  * Delete Item
  */
@@ -298,3 +491,38 @@ export const deleteItem = <ThrowOnError extends boolean = false>(
     url: "/items/{item_id}",
   });
 };
+
+/**
+ * Read Metrics
+ */
+export const readMetrics = <ThrowOnError extends boolean = false>(
+  options?: OptionsLegacyParser<unknown, ThrowOnError>,
+) => {
+  return (options?.client ?? client).get<
+    ReadMetricsResponse,
+    ReadMetricsError,
+    ThrowOnError
+  >({
+    ...options,
+    url: "/metrics/",
+  });
+};
+
+/**
+ * Read Jwks
+ * Public keys access tokens can be verified with, by key id.
+ *
+ * The set is empty when tokens are signed with a shared secret.
+ */
+export const readJwks = <ThrowOnError extends boolean = false>(
+  options?: OptionsLegacyParser<unknown, ThrowOnError>,
+) => {
+  return (options?.client ?? client).get<
+    ReadJwksResponse,
+    ReadJwksError,
+    ThrowOnError
+  >({
+    ...options,
+    url: "/.well-known/jwks.json",
+  });
+};
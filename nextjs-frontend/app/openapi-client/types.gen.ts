@@ -22,6 +22,31 @@ export type Body_auth_verify_verify = {
   token: string;
 };
 
+export type CountedPage_ItemRead_ = {
+  items: Array<ItemRead>;
+  total?: number | null;
+  page: number | null;
+  size: number | null;
+  pages?: number | null;
+  count_strategy: CountStrategy;
+};
+
+export type CountStrategy = "exact" | "cached" | "estimate";
+
+export type CursorPage_ItemRead_ = {
+  items: Array<ItemRead>;
+  next_cursor?: string | null;
+  previous_cursor?: string | null;
+  total?: number | null;
+};
+
+export type CursorPage_UserListRead_ = {
+  items: Array<UserListRead>;
+  next_cursor?: string | null;
+  previous_cursor?: string | null;
+  total?: number | null;
+};
+
 export type ErrorModel = {
   detail:
     | string
@@ -30,16 +55,38 @@ export type ErrorModel = {
       };
 };
 
+export type ExportFormat = "ndjson" | "csv";
+
 export type HTTPValidationError = {
   detail?: Array<ValidationError>;
 };
 
+export type ItemBulkDelete = {
+  ids?: Array<string> | null;
+  name?: string | null;
+};
+
+export type ItemBulkDeleteResult = {
+  deleted_ids: Array<string>;
+};
+
 export type ItemCreate = {
   name: string;
   description?: string | null;
   quantity?: number | null;
 };
 
+export type ItemImportError = {
+  line: number;
+  errors: Array<string>;
+};
+
+export type ItemImportResult = {
+  imported: number;
+  failed: number;
+  errors: Array<ItemImportError>;
+};
+
 export type ItemRead = {
   name: string;
   description?: string | null;
@@ -48,6 +95,11 @@ export type ItemRead = {
   user_id: string;
 };
 
+export type ItemStats = {
+  item_count: number;
+  total_quantity: number;
+};
+
 export type login = {
   grant_type?: string | null;
   username: string;
@@ -57,14 +109,6 @@ export type login = {
   client_secret?: string | null;
 };
 
-export type Page_ItemRead_ = {
-  items: Array<ItemRead>;
-  total?: number | null;
-  page: number | null;
-  size: number | null;
-  pages?: number | null;
-};
-
 export type UserCreate = {
   email: string;
   password: string;
@@ -73,6 +117,15 @@ export type UserCreate = {
   is_verified?: boolean | null;
 };
 
+export type UserListRead = {
+  id: string;
+  email: string;
+  is_active?: boolean;
+  is_superuser?: boolean;
+  is_verified?: boolean;
+  item_count?: number | null;
+};
+
 export type UserRead = {
   id: string;
   email: string;
@@ -107,6 +160,10 @@ export type AuthJwtLogoutResponse = unknown;
 
 export type AuthJwtLogoutError = unknown;
 
+export type RefreshTokenResponse = BearerResponse;
+
+export type RefreshTokenError = unknown;
+
 export type RegisterRegisterData = {
   body: UserCreate;
 };
@@ -147,6 +204,34 @@ export type VerifyVerifyResponse = UserRead;
 
 export type VerifyVerifyError = ErrorModel | HTTPValidationError;
 
+export type ReadUsersData = {
+  query?: {
+    /**
+     * Cursor of the page to read
+     */
+    cursor?: string | null;
+    /**
+     * Page size
+     */
+    size?: number;
+    /**
+     * Count all the matching users
+     */
+    include_total?: boolean;
+    is_active?: boolean | null;
+    is_verified?: boolean | null;
+    email_prefix?: string | null;
+    /**
+     * Include the number of items of each user
+     */
+    include_item_count?: boolean;
+  };
+};
+
+export type ReadUsersResponse = CursorPage_UserListRead_;
+
+export type ReadUsersError = HTTPValidationError;
+
 export type UsersCurrentUserResponse = UserRead;
 
 export type UsersCurrentUserError = unknown;
@@ -194,6 +279,12 @@ export type UsersDeleteUserResponse = void;
 export type UsersDeleteUserError = unknown | HTTPValidationError;
 
 export type ReadItemData = {
+  headers?: {
+    /**
+     * ETag of the page the client already has
+     */
+    "if-none-match"?: string | null;
+  };
   query?: {
     /**
      * Page number
@@ -203,10 +294,18 @@ export type ReadItemData = {
      * Page size
      */
     size?: number;
+    /**
+     * How the total is counted, only 'exact' is always accurate
+     */
+    count?: CountStrategy;
+    /**
+     * Comma separated item fields to return, the id is always included
+     */
+    fields?: string | null;
   };
 };
 
-export type ReadItemResponse = Page_ItemRead_;
+export type ReadItemResponse = CountedPage_ItemRead_;
 
 export type ReadItemError = HTTPValidationError;
 
@@ -218,6 +317,89 @@ export type CreateItemResponse = ItemRead;
 
 export type CreateItemError = HTTPValidationError;
 
+export type ReadItemCursorData = {
+  query?: {
+    /**
+     * Cursor of the page to read
+     */
+    cursor?: string | null;
+    /**
+     * Page size
+     */
+    size?: number;
+    /**
+     * Count all the user's items
+     */
+    include_total?: boolean;
+  };
+};
+
+export type ReadItemCursorResponse = CursorPage_ItemRead_;
+
+export type ReadItemCursorError = HTTPValidationError;
+
+export type ReadItemStatsResponse = ItemStats;
+
+export type ReadItemStatsError = unknown;
+
+export type SearchItemsData = {
+  query: {
+    /**
+     * Search terms
+     */
+    q: string;
+    /**
+     * Cursor of the page to read
+     */
+    cursor?: string | null;
+    /**
+     * Page size
+     */
+    size?: number;
+  };
+};
+
+export type SearchItemsResponse = CursorPage_ItemRead_;
+
+export type SearchItemsError = HTTPValidationError;
+
+export type ExportItemsData = {
+  query?: {
+    /**
+     * Export file format
+     */
+    format?: ExportFormat;
+  };
+};
+
+export type ExportItemsResponse = unknown;
+
+export type ExportItemsError = HTTPValidationError;
+
+export type ImportItemsData = {
+  body: string;
+};
+
+export type ImportItemsResponse = ItemImportResult;
+
+export type ImportItemsError = unknown;
+
+export type CreateItemsBulkData = {
+  body: Array<ItemCreate>;
+};
+
+export type CreateItemsBulkResponse = Array<ItemRead>;
+
+export type CreateItemsBulkError = HTTPValidationError;
+
+export type DeleteItemsBulkData = {
+  body: ItemBulkDelete;
+};
+
+export type DeleteItemsBulkResponse = ItemBulkDeleteResult;
+
+export type DeleteItemsBulkError = HTTPValidationError;
+
 export type DeleteItemData = {
   path: {
     item_id: string;
@@ -227,3 +409,11 @@ export type DeleteItemData = {
 export type DeleteItemResponse = unknown;
 
 export type DeleteItemError = HTTPValidationError;
+
+export type ReadMetricsResponse = unknown;
+
+export type ReadMetricsError = unknown;
+
+export type ReadJwksResponse = unknown;
+
+export type ReadJwksError = unknown;
@@ -5,6 +5,12 @@ import { readItem, deleteItem, createItem } from "@/app/clientService";
 import { revalidatePath } from "next/cache";
 import { redirect } from "next/navigation";
 import { itemSchema } from "@/lib/definitions";
+import { ReadItemResponse } from "@/app/openapi-client";
+
+// The last pages fetched, by token, page and size, with their ETag. They are
+// revalidated with If-None-Match, so unchanged pages aren't sent again.
+const itemPages = new Map<string, { etag: string; data: ReadItemResponse }>();
+const ITEM_PAGES_MAX_SIZE = 100;
 
 export async function fetchItems(page: number = 1, size: number = 10) {
   const cookieStore = await cookies();
@@ -14,18 +20,38 @@ export async function fetchItems(page: number = 1, size: number = 10) {
     return { message: "No access token found" };
   }
 
-  const { data, error } = await readItem({
+  const key = `${token}:${page}:${size}`;
+  const cached = itemPages.get(key);
+
+  // Typed loosely, as the schema only declares the If-None-Match header
+  const headers: Record<string, string> = {
+    Authorization: `Bearer ${token}`,
+    ...(cached && { "If-None-Match": cached.etag }),
+  };
+  const result = await readItem({
     query: {
       page: page,
       size: size,
     },
-    headers: {
-      Authorization: `Bearer ${token}`,
-    },
+    headers,
+    validateStatus: (status: number) =>
+      (status >= 200 && status < 300) || status === 304,
   });
 
-  if (error) {
-    return { message: error };
+  if (result.error) {
+    return { message: result.error };
+  }
+
+  const etag = result.headers?.etag;
+  const data = result.status === 304 && cached ? cached.data : result.data;
+
+  // Least recently used pages are dropped first
+  itemPages.delete(key);
+  if (etag) {
+    if (itemPages.size >= ITEM_PAGES_MAX_SIZE) {
+      itemPages.delete(itemPages.keys().next().value!);
+    }
+    itemPages.set(key, { etag, data });
   }
 
   return data;